@@ -20,6 +20,57 @@ async def read_user(username: str):
     return {"username": username}
 
 # path parameters containing paths
+import os
+from pathlib import Path
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+# directory the /files/ endpoint serves from: only what was put there on purpose,
+# never the working directory (that would serve .git/, .env, the databases...)
+FILES_ROOT = Path(os.environ.get("FILES_ROOT", Path(__file__).parent / "static")).resolve()
+
+
+class ZeroCopyFileResponse(FileResponse):
+    # starlette already handles Range / 206 Partial Content and sends "http.response.pathsend"
+    # (zero-copy, the server does the sendfile) when the ASGI server supports that extension.
+    # for servers without it, bigger chunks mean far fewer trips through python per GB.
+    chunk_size = 1024 * 1024
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    # strong validator: changes whenever the file is replaced (inode), touched (mtime) or resized
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/"x" matches "x". "*" matches any current file
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
 @app.get("/files/{file_path:path}")
-async def read_file(file_path: str):
-    return {"file_path": file_path}
\ No newline at end of file
+async def read_file(file_path: str, request: Request):
+    path = (FILES_ROOT / file_path).resolve()
+    if not path.is_relative_to(FILES_ROOT): # block ../ escaping out of the root
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        stat_result = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = file_etag(stat_result)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"etag": etag}) # client copy is still fresh
+
+    return ZeroCopyFileResponse(
+        path,
+        stat_result=stat_result, # reuse the stat above, no second syscall
+        headers={"etag": etag}, # overrides starlette's md5(mtime-size) etag
+        content_disposition_type="inline",
+    )
@@ -1,13 +1,171 @@
 # predefined values
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
 from enum import Enum
+from typing import Annotated
+
+import numpy as np
 from fastapi import FastAPI
+from pydantic import BaseModel, Field
 
 class ModelName(str, Enum):
     alexnet = "alexnet"
     resnet = "resnet"
     lenet = "lenet"
-    
-app = FastAPI()
+
+
+## numpy models behind each ModelName
+'''
+Tiny CPU models with fixed random weights. They are not trained, they just do
+the same kind of work as a real network: a few matmuls + activations per batch.
+Every forward() takes a whole batch (batch_size, INPUT_SIZE) at once.
+'''
+
+INPUT_SIZE = 64
+NUM_CLASSES = 10
+
+
+class NumpyModel:
+    def __init__(self, layer_sizes: list[int], residual: bool = False, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        sizes = [INPUT_SIZE, *layer_sizes, NUM_CLASSES]
+        self.weights = [
+            (rng.standard_normal((n_in, n_out)) / np.sqrt(n_in)).astype(np.float32)
+            for n_in, n_out in zip(sizes, sizes[1:])
+        ]
+        self.biases = [np.zeros(n_out, dtype=np.float32) for n_out in sizes[1:]]
+        self.residual = residual # add the input back when a layer keeps the same width
+
+    def forward(self, batch: np.ndarray) -> np.ndarray:
+        x = batch
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            h = np.maximum(x @ w + b, 0) # relu
+            x = h + x if self.residual and h.shape == x.shape else h
+        logits = x @ self.weights[-1] + self.biases[-1]
+        logits -= logits.max(axis=1, keepdims=True) # softmax, numerically stable
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+models = {
+    ModelName.alexnet: NumpyModel([512, 512, 256, 256, 128], seed=1),
+    ModelName.resnet: NumpyModel([256, 256, 256, 256, 256, 256], residual=True, seed=2),
+    ModelName.lenet: NumpyModel([120, 84], seed=3),
+}
+
+
+## dynamic micro-batching
+'''
+Requests don't call forward() themselves. They put their input on the model's
+queue and wait on a future. One worker per model takes the first waiting input,
+keeps collecting until max_batch_size inputs or max_wait_ms have passed, runs
+ONE forward() for the whole batch (in a thread, numpy releases the GIL) and
+hands each row of the result back to its waiting request.
+'''
+
+class BatchMetrics:
+    def __init__(self, window: int = 10_000):
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Counter() # batch size -> how many batches had that size
+        self.queue_wait_ms = deque(maxlen=window) # most recent waits, for percentiles
+
+    def record(self, size: int, waits_ms: list[float]):
+        self.batches += 1
+        self.items += size
+        self.batch_sizes[size] += 1
+        self.queue_wait_ms.extend(waits_ms)
+
+    def snapshot(self) -> dict:
+        waits = np.array(self.queue_wait_ms) if self.queue_wait_ms else np.zeros(1)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "queue_wait_ms": {
+                "p50": round(float(np.percentile(waits, 50)), 3),
+                "p99": round(float(np.percentile(waits, 99)), 3),
+                "max": round(float(waits.max()), 3),
+            },
+        }
+
+
+class MicroBatcher:
+    def __init__(self, model: NumpyModel, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = BatchMetrics()
+        self.queue: asyncio.Queue | None = None
+        self.worker: asyncio.Task | None = None
+
+    def start(self):
+        # the queue is created here so it belongs to the running event loop
+        self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+
+    async def predict(self, features: np.ndarray) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((features, future, time.perf_counter()))
+        return await future
+
+    async def collect(self) -> list:
+        batch = [await self.queue.get()] # block until there is at least one request
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # take whatever is already queued without waiting
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            remaining = deadline - time.perf_counter()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self.collect()
+            started = time.perf_counter()
+            inputs = np.stack([features for features, _, _ in batch])
+            try:
+                outputs = await asyncio.to_thread(self.model.forward, inputs)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for row, (_, future, _) in zip(outputs, batch):
+                if not future.done(): # the request may have been cancelled meanwhile
+                    future.set_result(row)
+            self.metrics.record(len(batch), [(started - enqueued) * 1000 for _, _, enqueued in batch])
+
+
+batchers = {name: MicroBatcher(model) for name, model in models.items()}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for batcher in batchers.values():
+        batcher.start()
+    yield
+    for batcher in batchers.values():
+        await batcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # endpoint using predefined values
 @app.get("/models/{model_name}")
@@ -18,4 +176,23 @@ async def get_model(model_name: ModelName):
     if model_name.value == "lenet":
         return {"model_name": model_name, "message": "LeCNN all the images"}
         
-    return {"model_name": model_name, "message": "Have some residuals"}
\ No newline at end of file
+    return {"model_name": model_name, "message": "Have some residuals"}
+
+
+## run inference through the batcher
+
+class PredictRequest(BaseModel):
+    features: Annotated[list[float], Field(min_length=INPUT_SIZE, max_length=INPUT_SIZE)]
+
+
+@app.post("/models/{model_name}/predict")
+async def predict(model_name: ModelName, request: PredictRequest):
+    features = np.asarray(request.features, dtype=np.float32)
+    probs = await batchers[model_name].predict(features)
+    label = int(probs.argmax())
+    return {"model_name": model_name, "label": label, "score": float(probs[label])}
+
+
+@app.get("/models/{model_name}/metrics")
+async def get_model_metrics(model_name: ModelName):
+    return {"model_name": model_name, **batchers[model_name].metrics.snapshot()}
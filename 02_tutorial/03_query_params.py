@@ -44,10 +44,95 @@ fake_items_db = [
     },
 ]
 
+## indexed item store with keyset (cursor) pagination
+import base64
+import binascii
+from array import array
+from bisect import bisect_left, bisect_right
+
+from fastapi import HTTPException, Response
+
+'''
+skip/limit says "give me the items at positions skip..skip+limit". If an item
+before that position is deleted (or inserted) between two page requests, every
+later item shifts by one and the client silently skips (or repeats) an item.
+A cursor says "give me the items after the last one I saw", so it doesn't care
+what happened on earlier pages.
+
+The store keeps item ids in a sorted array('q') (8 bytes each, no python int
+objects) with the names in a parallel list. A cursor is just the last id, so
+"page after cursor" is one binary search + a slice: page 100000 costs the same
+as page 1.
+'''
+
+class ItemStore:
+    def __init__(self, items: list[dict] = ()):
+        self.ids = array("q") # sorted ascending, insertion order == id order
+        self.names: list[str] = []
+        self.next_id = 0
+        for item in items:
+            self.add(item["item_name"])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, item_name: str) -> int:
+        item_id = self.next_id
+        self.next_id += 1
+        self.ids.append(item_id) # ids only grow, so appending keeps the array sorted
+        self.names.append(item_name)
+        return item_id
+
+    def delete(self, item_id: int) -> bool:
+        index = bisect_left(self.ids, item_id)
+        if index == len(self.ids) or self.ids[index] != item_id:
+            return False
+        del self.ids[index]
+        del self.names[index]
+        return True
+
+    def page_offset(self, skip: int, limit: int) -> tuple[list[dict], int | None]:
+        return self._page(skip, skip + limit)
+
+    def page_after(self, last_id: int | None, limit: int) -> tuple[list[dict], int | None]:
+        start = 0 if last_id is None else bisect_right(self.ids, last_id)
+        return self._page(start, start + limit)
+
+    def _page(self, start: int, stop: int) -> tuple[list[dict], int | None]:
+        page = [{"item_name": name} for name in self.names[start:stop]]
+        last_id = self.ids[stop - 1] if page and stop < len(self.ids) else None # None on the last page
+        return page, last_id
+
+
+def encode_cursor(last_id: int) -> str:
+    # opaque to clients: they must pass it back as-is, never build one themselves
+    return base64.urlsafe_b64encode(f"v1:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        version, last_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+        if version != "v1":
+            raise ValueError(version)
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+items_store = ItemStore(fake_items_db)
+
 # default query parameters
 @app.get("/items/")
-async def read_item(skip: int = 0, limit: int = 10):
-    return fake_items_db[skip : skip + limit] # skip means start from index skip, limit means take limit items
+async def read_item(response: Response, skip: int = 0, limit: int = 10, cursor: str | None = None):
+    # skip means start from index skip, limit means take limit items.
+    # cursor (from the X-Next-Cursor header of the previous page) takes precedence over skip
+    if cursor is not None:
+        page, last_id = items_store.page_after(decode_cursor(cursor), limit)
+    else:
+        page, last_id = items_store.page_offset(skip, limit)
+    if last_id is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(last_id) # the body stays a plain list
+    return page
 
 # optional query parameters
 @app.get("/users/")
@@ -49,4 +49,119 @@ async def update_user_item(
     result = {"user_id": user_id, "item_id": item_id, **item.model_dump()}
     if q: # if query parameter q is provided
         result.update({"q": q})
-    return result
\ No newline at end of file
+    return result
+
+## bulk ingest: newline-delimited JSON (NDJSON) in, NDJSON out
+import json
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+import numpy as np
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+'''
+one Item per line:
+{"name": "Foo", "price": 45.2, "tax": 3.5}
+{"name": "Bar", "price": 23.5}
+
+Lines are validated one by one (a bad line only fails itself) a chunk at a
+time, and price_with_tax for the whole chunk is one numpy add.
+Every record gets a result line back as soon as its chunk is done:
+{"record": 1, "item": {..., "price_with_tax": 48.7}}
+{"record": 2, "errors": [...]}
+and the last line is a summary.
+'''
+
+def validate_chunk(lines: list[bytes]) -> list[Item | list[dict]]:
+    # returns, per line, either the Item or that line's validation errors.
+    # each line is parsed on its own: joined into one array, a line holding two
+    # records ("{...},{...}") or a record split over two lines would still parse
+    results = []
+    for line in lines:
+        try:
+            results.append(Item.model_validate_json(line))
+        except ValidationError as exc:
+            results.append(exc.errors(include_url=False, include_context=False, include_input=False))
+    return results
+
+
+def process_chunk(lines: list[bytes], first_record: int) -> tuple[bytes, int]:
+    results = validate_chunk(lines)
+    valid = [r for r in results if isinstance(r, Item)]
+    prices = np.fromiter((item.price for item in valid), dtype=np.float64, count=len(valid))
+    taxes = np.fromiter(
+        (np.nan if item.tax is None else item.tax for item in valid), dtype=np.float64, count=len(valid)
+    )
+    with_tax = (prices + taxes).tolist() # nan where tax is None
+
+    out = []
+    valid_index = 0
+    for record_number, result in enumerate(results, start=first_record):
+        if isinstance(result, Item):
+            item_dict = result.model_dump()
+            if result.tax is not None:
+                item_dict["price_with_tax"] = with_tax[valid_index]
+            valid_index += 1
+            out.append(json.dumps({"record": record_number, "item": item_dict}))
+        else:
+            out.append(json.dumps({"record": record_number, "errors": result}))
+    return ("\n".join(out) + "\n").encode(), len(valid)
+
+
+class IngestStreamingResponse(StreamingResponse):
+    # StreamingResponse normally also reads receive() to notice disconnects, which
+    # would steal the request body we're still reading while streaming results.
+    # here the body reader gets the disconnect itself (request.stream() raises ClientDisconnect)
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n") # keep the unfinished last line in the buffer
+        for line in lines:
+            yield line
+    yield buffer # last line may have no trailing newline
+
+
+@app.post(
+    "/items/bulk",
+    response_class=IngestStreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": Item.model_json_schema()}},
+        }
+    },
+)
+async def create_items_bulk(
+    request: Request,
+    chunk_size: Annotated[int, Query(ge=1, le=10_000)] = 1000, # lines validated per call
+):
+    async def results() -> AsyncIterator[bytes]:
+        received = accepted = 0
+        chunk: list[bytes] = []
+        async for line in ndjson_lines(request):
+            line = line.strip()
+            if not line:
+                continue # blank lines are allowed between records
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                out, ok = process_chunk(chunk, received + 1)
+                received, accepted = received + len(chunk), accepted + ok
+                chunk = []
+                yield out
+        if chunk:
+            out, ok = process_chunk(chunk, received + 1)
+            received, accepted = received + len(chunk), accepted + ok
+            yield out
+        summary = {"received": received, "accepted": accepted, "rejected": received - accepted}
+        yield (json.dumps({"summary": summary}) + "\n").encode()
+
+    return IngestStreamingResponse(results(), media_type="application/x-ndjson")
@@ -94,16 +94,84 @@ async def read_invoices(
         results.update({"q": q})
     return results
 
+## multi-get for payments
+import asyncio
+from typing import Protocol
+
+from fastapi import Depends
+
+'''
+GET /payments/?q=Pay1&q=Pay2&q=Pay3 resolves every id in one round trip.
+Ids are deduplicated, looked up concurrently (at most MULTI_GET_CONCURRENCY at a
+time) and returned in the order they were asked for. A missing or failing id
+gets an "error" entry instead of failing the whole request.
+
+The backend is anything with `async def get(payment_id) -> dict` that raises
+KeyError for unknown ids. Swap it with app.dependency_overrides[get_payment_backend].
+'''
+
+MULTI_GET_CONCURRENCY = 16
+MULTI_GET_TIMEOUT = 2.0 # seconds per id
+
+
+class PaymentBackend(Protocol):
+    async def get(self, payment_id: str) -> dict: ...
+
+
+class InMemoryPaymentBackend:
+    def __init__(self, payments: dict[str, dict], latency: float = 0.0):
+        self.payments = payments
+        self.latency = latency # pretend to be a remote service
+
+    async def get(self, payment_id: str) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.payments[payment_id] # KeyError when unknown
+
+
+payment_backend = InMemoryPaymentBackend({
+    "Pay1": {"amount": 120.0, "currency": "EUR", "status": "settled"},
+    "Pay2": {"amount": 35.5, "currency": "USD", "status": "pending"},
+    "Pay3": {"amount": 9.99, "currency": "IDR", "status": "refunded"},
+})
+
+def get_payment_backend() -> PaymentBackend:
+    return payment_backend
+
+
+async def multi_get(backend: PaymentBackend, ids: list[str]) -> list[dict]:
+    semaphore = asyncio.Semaphore(MULTI_GET_CONCURRENCY)
+
+    async def fetch(payment_id: str) -> dict:
+        async with semaphore:
+            try:
+                payment = await asyncio.wait_for(backend.get(payment_id), MULTI_GET_TIMEOUT)
+            except KeyError:
+                return {"payment_id": payment_id, "error": "not_found"}
+            except asyncio.TimeoutError:
+                return {"payment_id": payment_id, "error": "timeout"}
+            except Exception as exc:
+                return {"payment_id": payment_id, "error": type(exc).__name__}
+            return {"payment_id": payment_id, **payment}
+
+    unique_ids = list(dict.fromkeys(ids)) # each id is fetched once, first-seen order
+    fetched = await asyncio.gather(*(fetch(payment_id) for payment_id in unique_ids))
+    by_id = dict(zip(unique_ids, fetched))
+    return [by_id[payment_id] for payment_id in ids] # request order, duplicates included
+
+
 # query parameter list / multiple values
 @app.get("/payments/")
 async def read_payment(
     q: Annotated[
         list[str] | None, # list of strings or None
-        Query()
-    ] # = None #  add = None to make it optional
+        Query(max_length=100) # max_length on a list limits how many values
+    ], # = None #  add = None to make it optional
+    backend: Annotated[PaymentBackend, Depends(get_payment_backend)],
 ):
     results = {"payments": [{"payment_id": "Pay1"}, {"payment_id": "Pay2"}]}
     if q:
+        results = {"payments": await multi_get(backend, q)}
         results.update({"q": q})
     return results
 
@@ -129,6 +197,292 @@ async def read_deliveries(
     query_items = {"q": q}
     return query_items
 
+## full-text search engine for reviews
+import math
+import re
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+'''
+Inverted index: for every term, the ids of the reviews that contain it (posting
+list, sorted because ids only grow) and how many times (term frequency).
+Posting lists are numpy arrays with spare capacity, so adding a review appends
+in place and the next search sees it.
+
+Scoring is BM25:
+    idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avg_doc_len))
+
+A common word can be in most reviews, and scoring millions of postings per
+query is too slow. So, per term, the BM25 scores of its postings are computed
+once and kept with an order from best to worst ("impact ordered"), cut into
+blocks of equal score: block j holds the postings that score exactly
+levels[j], so the first level_ends[j] postings in impact order are the ones
+scoring at least levels[j] and every later one scores at most levels[j + 1].
+BM25 of a term only takes a few hundred values (tf and review length are
+small integers), so there are few blocks even for millions of postings.
+
+A query needs the k-th best score `theta` to know what can be skipped:
+1. the best FIRST_DEPTH postings of each term give a first, low theta
+2. per term, pick how many blocks to read so that the score caps of what is
+   left unread add up to less than theta: a review unread in every term can't
+   make the top k. Reading fewer blocks of one term means reading more of the
+   others; the split with the fewest postings is found with a Lagrangian
+   (minimize postings + lam * caps per term, bisect lam until the caps fit).
+   If that is far more than what step 1 read, step 1 goes 4x deeper (a
+   better theta, a cheaper plan) and we plan again
+3. the reviews read are grouped (a sort): their scores in the terms they were
+   read in are known, the rest is at most the unread caps. Reviews whose
+   known score + caps can't reach theta are dropped (MaxScore), the others get
+   their missing term scores looked up (binary search in the posting list)
+Every review that can reach the top k is read in some term, so the result is
+the same as scoring every posting, ties included (oldest review first).
+
+Blocks over review ids (the max score per 128 consecutive ids, block-max
+WAND) don't prune here: a common word has a near-maximal score in almost every
+block, so their summed caps pass theta in 94-100% of them.
+
+The collection statistics (review count, average length) behind the cached
+scores are refreshed whenever the index grew by more than 1%, and postings
+added since a term's scores were cached are scored at query time, they are
+always read.
+
+At 5M reviews on one core (03_benchmarks/05_reviews_search.py) the steady-state
+p99 is 5.7 ms. A term's first query pays for its cached scores (an argsort of
+up to millions of postings), so the first pass p99 is ~100 ms.
+'''
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its of on or so that the this to was were with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class GrowableArray:
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, capacity: int = 4):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            self.data = np.resize(self.data, 2 * len(self.data)) # doubling, amortized O(1)
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        return self.data[: self.size]
+
+
+FIRST_DEPTH = 1024 # postings per term read for the first theta
+PLAN_GROWTH = 16 # a plan reading more than this times the first pass: go deeper first
+SCORE_SLACK = 1e-4 # margin on score bounds for float32 rounding
+
+
+class TermImpacts:
+    __slots__ = ("version", "size", "idf", "scores", "order", "levels", "level_ends")
+
+    def __init__(self, version: int, size: int, idf: float, scores: np.ndarray, order: np.ndarray):
+        self.version = version # stats version the scores were computed with
+        self.size = size # postings covered, later ones are scored per query
+        self.idf = idf
+        self.scores = scores # BM25 of posting i
+        self.order = order # posting positions, best score first
+        ordered = scores[order]
+        starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+        self.levels = ordered[starts].astype(np.float64) # distinct scores, best first
+        self.level_ends = np.append(starts[1:], size) # postings scoring at least levels[j]
+
+    def cap(self, depth: int) -> float:
+        # best score of the postings after the first `depth` in impact order
+        return float(self.scores[self.order[depth]]) if depth < self.size else 0.0
+
+
+def plan_depths(impacts: list[TermImpacts], theta: float) -> tuple[list[int], list[float]]:
+    # per term, the postings to read (whole blocks) and the cap of the unread ones:
+    # caps adding up to less than theta, as few postings as possible
+    options = [
+        (np.append(term.levels, 0.0), np.concatenate(([0], term.level_ends)).astype(np.float64))
+        for term in impacts
+    ] # (cap, depth) after reading 0, 1, ... blocks
+    budget = theta - SCORE_SLACK
+
+    def pick(lam: float) -> list[int]:
+        return [int(np.argmin(depths + lam * caps)) for caps, depths in options]
+
+    def capped(picks: list[int]) -> float:
+        return sum(float(caps[j]) for (caps, _), j in zip(options, picks))
+
+    low, high = 0.0, 1.0
+    while capped(pick(high)) > budget: # reading everything (caps 0) always fits
+        high *= 16
+    for _ in range(30):
+        lam = (low + high) / 2
+        if capped(pick(lam)) > budget:
+            low = lam
+        else:
+            high = lam
+    picks = pick(high)
+    return [int(depths[j]) for (_, depths), j in zip(options, picks)], [float(caps[j]) for (caps, _), j in zip(options, picks)]
+
+
+class ReviewIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.texts: list[str] = []
+        self.doc_lengths = GrowableArray(np.int32, 1024)
+        self.total_length = 0
+        self.postings: dict[str, tuple[GrowableArray, GrowableArray]] = {} # term -> (review ids, term freqs)
+        self.impacts: dict[str, TermImpacts] = {}
+        self.stats_version = 0
+        self.stats_count = 0
+        self.stats_avg_length = 1.0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text: str) -> int:
+        review_id = len(self.texts)
+        tokens = tokenize(text)
+        counts: dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (GrowableArray(np.int32), GrowableArray(np.uint16))
+            entry[0].append(review_id)
+            entry[1].append(min(tf, 65535))
+        self.texts.append(text)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        return review_id
+
+    def _refresh_stats(self):
+        count = len(self.texts)
+        if count > self.stats_count + self.stats_count // 100: # grew by more than 1%
+            self.stats_count = count
+            self.stats_avg_length = self.total_length / count or 1.0
+            self.stats_version += 1
+
+    def _bm25(self, ids: np.ndarray, tfs: np.ndarray, idf: float) -> np.ndarray:
+        tf = tfs.astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths.view()[ids] / self.stats_avg_length)
+        return ((idf * (self.k1 + 1)) * tf / (tf + norm)).astype(np.float32)
+
+    def _term_impacts(self, term: str) -> TermImpacts:
+        ids, tfs = (array.view() for array in self.postings[term])
+        cached = self.impacts.get(term)
+        if (
+            cached is None
+            or cached.version != self.stats_version
+            or len(ids) - cached.size > max(1024, cached.size // 100)
+        ):
+            count = max(self.stats_count, len(ids))
+            idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores = self._bm25(ids, tfs, idf)
+            order = np.argsort(-scores, kind="stable").astype(np.int32)
+            cached = self.impacts[term] = TermImpacts(self.stats_version, len(ids), idf, scores, order)
+        return cached
+
+    def search(self, query: str, k: int = 10) -> list[tuple[int, float]]:
+        self._refresh_stats()
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.postings] # unique, known terms
+        if not terms:
+            return []
+
+        lists = []
+        for term in terms:
+            impacts = self._term_impacts(term)
+            ids, tfs = (array.view() for array in self.postings[term])
+            tail_scores = self._bm25(ids[impacts.size :], tfs[impacts.size :], impacts.idf)
+            lists.append((ids, impacts, tail_scores))
+
+        def lookup(i: int, reviews: np.ndarray) -> np.ndarray:
+            # scores of (sorted) reviews in term i, 0 where the term isn't in the review
+            ids, impacts, tail_scores = lists[i]
+            positions = np.minimum(np.searchsorted(ids, reviews), len(ids) - 1)
+            found = ids[positions] == reviews
+            scores = impacts.scores[np.minimum(positions, impacts.size - 1)]
+            if len(tail_scores):
+                from_tail = tail_scores[np.clip(positions - impacts.size, 0, len(tail_scores) - 1)]
+                scores = np.where(positions < impacts.size, scores, from_tail)
+            return np.where(found, scores, 0)
+
+        def read(depths: list[int], caps: list[float], theta: float) -> tuple[np.ndarray, np.ndarray]:
+            # exact scores of the reviews among the first depths[i] postings of each term (and
+            # the unordered tails) that can still reach theta, caps[i]: best unread score of term i
+            found, scores, terms_of = [], [], []
+            for i, ((ids, impacts, tail_scores), depth) in enumerate(zip(lists, depths)):
+                positions = impacts.order[:depth]
+                found += [ids[positions], ids[impacts.size :]]
+                scores += [impacts.scores[positions], tail_scores]
+                terms_of.append(np.full(len(positions) + len(tail_scores), i, dtype=np.int32))
+            found, scores, terms_of = np.concatenate(found), np.concatenate(scores), np.concatenate(terms_of)
+            by_review = np.argsort(found, kind="stable")
+            found, scores, terms_of = found[by_review], scores[by_review], terms_of[by_review]
+            first = np.concatenate(([True], found[1:] != found[:-1]))
+            starts = np.flatnonzero(first)
+            known = np.add.reduceat(scores, starts) # a lower bound of the review's score
+            caps = np.asarray(caps, dtype=np.float32)
+            upper = known + (caps.sum() - np.add.reduceat(caps[terms_of], starts))
+            if len(known) >= k:
+                theta = max(theta, float(np.partition(known, len(known) - k)[len(known) - k]))
+            keep = upper >= theta - SCORE_SLACK
+            group = np.cumsum(first) - 1 # review of each posting read
+            read_in = np.zeros((len(lists), int(keep.sum())), dtype=bool)
+            kept = keep[group]
+            read_in[terms_of[kept], (np.cumsum(keep) - 1)[group[kept]]] = True
+            reviews, totals = found[starts[keep]], known[keep]
+            for i in range(len(lists)):
+                missing = np.flatnonzero(~read_in[i])
+                if len(missing) and caps[i] > 0:
+                    totals[missing] += lookup(i, reviews[missing])
+            return reviews, totals
+
+        term_impacts = [impacts for _, impacts, _ in lists]
+        depth = max(FIRST_DEPTH, k)
+        while True:
+            reviews, scores = read([depth] * len(lists), [term.cap(depth) for term in term_impacts], -math.inf)
+            if all(term.size <= depth for term in term_impacts):
+                break # every posting has been read
+            theta = float(np.partition(scores, len(scores) - k)[len(scores) - k])
+            depths, caps = plan_depths(term_impacts, theta)
+            if sum(depths) <= PLAN_GROWTH * depth * len(lists) or depth * 4 >= max(term.size for term in term_impacts):
+                reviews, scores = read(depths, caps, theta)
+                break
+            depth *= 4
+
+        best = np.arange(len(scores))
+        if len(scores) > k:
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)[: k - len(above)] # reviews are sorted: the oldest ties
+            best = np.concatenate((above, tied))
+        best = best[np.lexsort((reviews[best], -scores[best]))] # score desc, then oldest review first
+        return [(int(reviews[i]), float(scores[i])) for i in best]
+
+
+review_index = ReviewIndex()
+for text in (
+    "Great product, works exactly as described and shipping was fast.",
+    "Terrible battery life, the phone dies before lunch.",
+    "Good value for the price, but the manual is confusing.",
+    "Fast delivery and great customer service, would buy again.",
+):
+    review_index.add(text)
+
+
+def review_id_of(index: int) -> str:
+    return f"Rev{index + 1}"
+
+
 # declare more metadata
 @app.get("/reviews/")
 async def read_reviews(
@@ -138,14 +492,32 @@ async def read_reviews(
             title="Query Title", # title metadata
             description="Query string for the reviews to search in the database that have a good match", # description metadata
         )
-    ] = None
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
 ):
-    results = {"reviews": [{"review_id": "Rev1"}, {"review_id": "Rev2"}]}
-    if q:
-        results.update({"q": q})
+    if not q:
+        latest = range(len(review_index) - 1, max(len(review_index) - limit, 0) - 1, -1)
+        return {"reviews": [{"review_id": review_id_of(i), "text": review_index.texts[i]} for i in latest]}
+    results = {
+        "reviews": [
+            {"review_id": review_id_of(i), "text": review_index.texts[i], "score": round(score, 4)}
+            for i, score in review_index.search(q, limit)
+        ]
+    }
+    results.update({"q": q})
     return results
 
 
+class Review(BaseModel):
+    text: str = Field(min_length=1, max_length=5000)
+
+
+@app.post("/reviews/")
+async def create_review(review: Review):
+    index = review_index.add(review.text) # searchable right away
+    return {"review_id": review_id_of(index), "text": review.text}
+
+
 # alias parameters
 @app.get("/coupons/")
 async def read_coupons(
@@ -207,11 +579,250 @@ data = {
     "isbn-9781439512982": "Isaac Asimov: The Complete Stories, Vol. 2",
 }
 
+VALID_ID_PREFIXES = ("isbn-", "imdb-")
+
 def check_valid_id(id: str):
-    if not id.startswith(("isbn-", "imdb-")):
+    if not id.startswith(VALID_ID_PREFIXES):
         raise ValueError("Invalid ID format. Must start with 'isbn-' or 'imdb-'.")
     return id
 
+
+## book catalog engine
+import numpy as np
+
+'''
+Sized for tens of millions of ids without a python object per book:
+- ids live in one fixed-width numpy bytes array (ID_WIDTH bytes each)
+- titles are stored once, utf-8 encoded and packed end to end in one bytes
+  buffer, with an array of offsets: no str per title. Each book keeps a 4-byte
+  reference to its title (the same title under an isbn- and an imdb- id is
+  stored once), found through an open-addressing table of title references
+  like the id index
+- hash index: open-addressing table of row numbers, linear probing, load <= 0.5
+- prefix index: row numbers sorted by id, binary searched for a prefix range.
+  rows added after the last sort sit in a small unsorted tail that is scanned,
+  the index is re-sorted once the tail gets big
+- random pick: one random row number, nothing is copied
+'''
+
+ID_WIDTH = 32 # bytes per id, isbn-9781529046137 is 18
+
+
+def hash_ids(ids: np.ndarray) -> np.ndarray:
+    # vectorized 64-bit hash of fixed-width ids: mix the 4 uint64 words of each id
+    words = ids.view(np.uint64).reshape(-1, ID_WIDTH // 8)
+    h = words[:, 0] * np.uint64(0x9E3779B97F4A7C15)
+    h ^= words[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F)
+    h ^= words[:, 2] * np.uint64(0x165667B19E3779F9)
+    h ^= words[:, 3] * np.uint64(0xD6E8FEB86659FD93)
+    h ^= h >> np.uint64(31)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(29)
+    return h
+
+
+MASK64 = (1 << 64) - 1
+
+def hash_id(key: bytes) -> int:
+    # same hash as hash_ids() for a single id, in plain python (much cheaper than numpy for one value)
+    w0, w1, w2, w3 = (int.from_bytes(key[i : i + 8].ljust(8, b"\0"), "little") for i in range(0, ID_WIDTH, 8))
+    h = (w0 * 0x9E3779B97F4A7C15) & MASK64
+    h ^= (w1 * 0xC2B2AE3D27D4EB4F) & MASK64
+    h ^= (w2 * 0x165667B19E3779F9) & MASK64
+    h ^= (w3 * 0xD6E8FEB86659FD93) & MASK64
+    h ^= h >> 31
+    h = (h * 0x94D049BB133111EB) & MASK64
+    return h ^ (h >> 29)
+
+
+class BookCatalog:
+    def __init__(self, capacity: int = 1024):
+        self.ids = np.zeros(capacity, dtype=f"S{ID_WIDTH}")
+        self.title_refs = np.zeros(capacity, dtype=np.int32)
+        self.title_data = bytearray() # every distinct title, utf-8, end to end
+        self.title_offsets = np.zeros(capacity + 1, dtype=np.int64) # title i is title_data[offsets[i]:offsets[i + 1]]
+        self.title_count = 0
+        self.title_slots = np.zeros(2 * capacity, dtype=np.int32) # hash table of titles, ref + 1 (0 = empty slot)
+        self.size = 0
+        self.slots = np.zeros(2 * capacity, dtype=np.int64) # hash table, row + 1 (0 = empty slot)
+        self.sorted_rows = np.zeros(0, dtype=np.int64) # rows [0, sorted_upto) in id order
+        self.sorted_upto = 0
+
+    def __len__(self):
+        return self.size
+
+    def _title(self, ref: int) -> str:
+        offsets = self.title_offsets
+        return self.title_data[offsets.item(ref) : offsets.item(ref + 1)].decode()
+
+    def _title_ref(self, title: str) -> int:
+        key = title.encode()
+        slots, offsets, data = self.title_slots, self.title_offsets, self.title_data
+        mask = len(slots) - 1
+        slot = hash(key) & mask
+        while True:
+            ref = slots.item(slot) - 1
+            if ref < 0:
+                break # not stored yet, goes in this slot
+            if data[offsets.item(ref) : offsets.item(ref + 1)] == key:
+                return ref
+            slot = (slot + 1) & mask
+        ref = self.title_count
+        if ref + 2 > len(offsets):
+            offsets = self.title_offsets = np.resize(offsets, 2 * len(offsets))
+        data += key
+        offsets[ref + 1] = len(data)
+        self.title_count += 1
+        slots[slot] = ref + 1
+        if 2 * self.title_count > len(slots):
+            self._rebuild_title_hash(2 * len(slots))
+        return ref
+
+    def _reserve_titles(self, extra: int):
+        # room for `extra` more titles: one resize and at most one rehash for a bulk load
+        needed = self.title_count + extra
+        if needed + 1 > len(self.title_offsets):
+            self.title_offsets = np.resize(self.title_offsets, needed + 1)
+        table_size = len(self.title_slots)
+        while table_size < 2 * needed:
+            table_size *= 2
+        if table_size > len(self.title_slots):
+            self._rebuild_title_hash(table_size)
+
+    def _rebuild_title_hash(self, table_size: int):
+        slots = [0] * table_size # a python list while filling it, one numpy copy at the end
+        mask = table_size - 1
+        data = self.title_data
+        offsets = self.title_offsets[: self.title_count + 1].tolist()
+        for ref in range(self.title_count):
+            slot = hash(bytes(data[offsets[ref] : offsets[ref + 1]])) & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = ref + 1
+        self.title_slots = np.array(slots, dtype=np.int32)
+
+    def _grow(self, needed: int):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.ids = np.resize(self.ids, capacity) # np.resize fills with copies, harmless past self.size
+        self.title_refs = np.resize(self.title_refs, capacity)
+
+    def _find_row(self, key: bytes) -> int:
+        # row of key, or -1. key is the encoded id
+        if len(key) > ID_WIDTH:
+            return -1
+        mask = len(self.slots) - 1
+        slot = hash_id(key) & mask
+        while True:
+            row = int(self.slots[slot]) - 1
+            if row < 0:
+                return -1
+            if self.ids[row] == key:
+                return row
+            slot = (slot + 1) & mask
+
+    def _rebuild_hash(self, table_size: int):
+        # vectorized linear-probing insert: every round, each still-unplaced row tries its
+        # current slot, one winner per free slot is placed, everybody else moves one slot on
+        slots = np.zeros(table_size, dtype=np.int64)
+        mask = np.uint64(table_size - 1)
+        rows = np.arange(self.size, dtype=np.int64)
+        positions = (hash_ids(self.ids[: self.size]) & mask).astype(np.int64)
+        while rows.size:
+            free = np.flatnonzero(slots[positions] == 0)
+            taken_positions, first = np.unique(positions[free], return_index=True)
+            winners = free[first]
+            slots[taken_positions] = rows[winners] + 1
+            placed = np.zeros(rows.size, dtype=bool)
+            placed[winners] = True
+            rows = rows[~placed]
+            positions = (positions[~placed] + 1) & (table_size - 1)
+        self.slots = slots
+
+    def _reindex_prefixes(self):
+        self.sorted_rows = np.argsort(self.ids[: self.size], kind="stable")
+        self.sorted_upto = self.size
+
+    def extend(self, ids, titles):
+        # bulk load, ids must not already be in the catalog
+        new_ids = np.array(list(ids), dtype=f"S{ID_WIDTH}")
+        titles = list(titles)
+        distinct = dict.fromkeys(titles) # this load's titles, each looked up once (dropped on return)
+        self._reserve_titles(len(distinct))
+        for title in distinct:
+            distinct[title] = self._title_ref(title)
+        refs = np.fromiter(map(distinct.__getitem__, titles), dtype=np.int32, count=len(new_ids))
+        start, end = self.size, self.size + len(new_ids)
+        self._grow(end)
+        self.ids[start:end] = new_ids
+        self.title_refs[start:end] = refs
+        self.size = end
+        table_size = len(self.slots)
+        while table_size < 2 * self.size:
+            table_size *= 2
+        self._rebuild_hash(table_size)
+        self._reindex_prefixes()
+
+    def add(self, id: str, title: str):
+        key = id.encode()
+        if len(key) > ID_WIDTH:
+            raise ValueError(f"id longer than {ID_WIDTH} bytes")
+        row = self._find_row(key)
+        if row >= 0:
+            self.title_refs[row] = self._title_ref(title) # known id, just retitle it
+            return
+        self._grow(self.size + 1)
+        row = self.size
+        self.ids[row] = key
+        self.title_refs[row] = self._title_ref(title)
+        self.size += 1
+        if 2 * self.size > len(self.slots):
+            self._rebuild_hash(2 * len(self.slots))
+        else:
+            mask = len(self.slots) - 1
+            slot = hash_id(key) & mask
+            while self.slots[slot]:
+                slot = (slot + 1) & mask
+            self.slots[slot] = row + 1
+        if self.size - self.sorted_upto > max(1024, self.size // 64):
+            self._reindex_prefixes() # tail too long to keep scanning
+
+    def get(self, id: str) -> str | None:
+        row = self._find_row(id.encode())
+        return None if row < 0 else self._title(self.title_refs.item(row))
+
+    def random_book(self) -> tuple[str, str]:
+        row = random.randrange(self.size)
+        return self.ids[row].decode(), self._title(self.title_refs.item(row))
+
+    def _prefix_span(self, prefix: bytes) -> tuple[int, int]:
+        sorted_ids = self.ids[: self.sorted_upto]
+        low = np.searchsorted(sorted_ids, prefix, side="left", sorter=self.sorted_rows)
+        high = np.searchsorted(sorted_ids, prefix + b"\xff", side="left", sorter=self.sorted_rows)
+        return int(low), int(high)
+
+    def _tail_matches(self, prefix: bytes) -> np.ndarray:
+        tail = self.ids[self.sorted_upto : self.size]
+        return self.sorted_upto + np.flatnonzero(np.char.startswith(tail, prefix))
+
+    def count_prefix(self, prefix: str) -> int:
+        low, high = self._prefix_span(prefix.encode())
+        return high - low + len(self._tail_matches(prefix.encode()))
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> list[tuple[str, str]]:
+        key = prefix.encode()
+        low, high = self._prefix_span(key)
+        rows = np.concatenate([self.sorted_rows[low : min(high, low + limit)], self._tail_matches(key)])
+        rows = rows[np.argsort(self.ids[rows], kind="stable")][:limit] # merge in the tail matches
+        return [(self.ids[row].decode(), self._title(self.title_refs.item(row))) for row in rows]
+
+
+catalog = BookCatalog()
+catalog.extend(data.keys(), data.values())
+
 @app.get("/books/")
 async def read_books(
     id: Annotated[
@@ -220,7 +831,25 @@ async def read_books(
     ] = None
 ):
     if id:
-        title = data.get(id, "Unknown Book")
+        title = catalog.get(id) or "Unknown Book"
     else:
-        id, title = random.choice(list(data.items()))
-    return {"id": id, "title": title}
\ No newline at end of file
+        id, title = catalog.random_book() # constant time, no copy of the catalog
+    return {"id": id, "title": title}
+
+
+def check_valid_prefix(prefix: str):
+    # "isb" is fine while typing, "foo" can never match a valid id
+    if not any(prefix.startswith(p) or p.startswith(prefix) for p in VALID_ID_PREFIXES):
+        raise ValueError("Invalid prefix. Must be part of or start with 'isbn-' or 'imdb-'.")
+    return prefix
+
+@app.get("/books/autocomplete")
+async def autocomplete_books(
+    q: Annotated[str, Query(min_length=1, max_length=ID_WIDTH), AfterValidator(check_valid_prefix)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+):
+    return {
+        "q": q,
+        "count": catalog.count_prefix(q),
+        "results": [{"id": id, "title": title} for id, title in catalog.autocomplete(q, limit)],
+    }
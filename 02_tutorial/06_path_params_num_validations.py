@@ -1,6 +1,6 @@
 # Path Parameters and Numeric Validations
 
-from typing import Annotated
+from typing import Annotated, Literal, get_args
 from fastapi import FastAPI, Path, Query
 
 app = FastAPI()
@@ -68,6 +68,92 @@ async def read_products(
         result.update({"q": q})
     return result
 
+## dense order table
+import numpy as np
+from pydantic import BaseModel, Field
+
+'''
+order_id is validated to 0..1000, so orders can live in one numpy structured
+array where row == order_id: lookup is an index, there is no python object per
+order, and a price range query is a couple of vectorized comparisons over the
+price column instead of a python loop over every order.
+'''
+
+MAX_ORDER_ID = 1000
+OrderStatus = Literal["pending", "paid", "shipped", "cancelled"]
+ORDER_STATUSES = get_args(OrderStatus) # stored as a uint8 code: the index in here
+MAX_QUANTITY = 2**31 - 1 # quantity is stored as an int32
+
+order_dtype = np.dtype([
+    ("exists", np.bool_),
+    ("price", np.float64),
+    ("quantity", np.int32),
+    ("status", np.uint8),
+])
+
+
+class OrderTable:
+    def __init__(self, capacity: int):
+        self.rows = np.zeros(capacity, dtype=order_dtype) # all "exists" False
+
+    def __len__(self):
+        return int(np.count_nonzero(self.rows["exists"]))
+
+    def put(self, order_id: int, price: float, quantity: int, status: str):
+        self.rows[order_id] = (True, price, quantity, ORDER_STATUSES.index(status))
+
+    def get(self, order_id: int) -> dict | None:
+        exists, price, quantity, status = self.rows[order_id].tolist()
+        if not exists:
+            return None
+        return {"order_id": order_id, "price": price, "quantity": quantity, "status": ORDER_STATUSES[status]}
+
+    def price_range(self, min_price: float, max_price: float, limit: int) -> tuple[int, list[dict]]:
+        price = self.rows["price"]
+        mask = self.rows["exists"] & (price >= min_price) & (price <= max_price)
+        ids = np.flatnonzero(mask)
+        page = self.rows[ids[:limit]]
+        orders = [
+            {"order_id": order_id, "price": price, "quantity": quantity, "status": ORDER_STATUSES[status]}
+            for order_id, (_, price, quantity, status) in zip(ids[:limit].tolist(), page.tolist())
+        ]
+        return len(ids), orders
+
+
+orders_table = OrderTable(MAX_ORDER_ID + 1)
+_rng = np.random.default_rng(42) # some demo orders
+orders_table.rows["exists"] = True
+orders_table.rows["price"] = _rng.uniform(0.5, 10.4, MAX_ORDER_ID + 1).round(2)
+orders_table.rows["quantity"] = _rng.integers(1, 20, MAX_ORDER_ID + 1)
+orders_table.rows["status"] = _rng.integers(0, len(ORDER_STATUSES), MAX_ORDER_ID + 1)
+
+
+class Order(BaseModel):
+    price: float = Field(gt=0, lt=10.5)
+    quantity: int = Field(default=1, ge=1, le=MAX_QUANTITY)
+    status: OrderStatus = "pending"
+
+
+# price range query over the whole table
+@app.get("/orders/")
+async def read_orders_by_price(
+    min_price: Annotated[float, Query(gt=0, lt=10.5)],
+    max_price: Annotated[float, Query(gt=0, lt=10.5)],
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    total, orders = orders_table.price_range(min_price, max_price, limit)
+    return {"total": total, "orders": orders}
+
+
+@app.put("/orders/{order_id}")
+async def put_order(
+    order_id: Annotated[int, Path(ge=0, le=MAX_ORDER_ID)],
+    order: Order,
+):
+    orders_table.put(order_id, order.price, order.quantity, order.status)
+    return orders_table.get(order_id)
+
+
 # Number validations: floats, greater than and less than
 @app.get("/orders/{order_id}")
 async def read_orders(
@@ -94,4 +180,7 @@ async def read_orders(
         result.update({"q": q})
     if price:
         result.update({"price": price})
-    return result
\ No newline at end of file
+    order = orders_table.get(order_id) # O(1), row == order_id
+    if order:
+        result.update({"order": order})
+    return result
@@ -14,35 +14,245 @@ from pydantic import BaseModel, Field
 app = FastAPI()
 
 
+## query engine for the filters
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+'''
+Items are kept column-wise and indexed once:
+- for each order_by column, the item rows presorted by that column, plus each
+  row's rank (its position in that order)
+- for each tag, a bitmap with one bit per item (packed, 1 byte per 8 items)
+
+Filtering by several tags is AND-ing their bitmaps. Ordering never sorts the
+matches: without tags the page is a slice of the presorted rows, with tags the
+matching rows' ranks are partitioned so only the offset + limit smallest ranks
+are sorted.
+'''
+
+class ItemIndex:
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self.size = len(items)
+        self.orders: dict[str, np.ndarray] = {}
+        self.ranks: dict[str, np.ndarray] = {}
+        for column in ("created_at", "updatedat"):
+            values = np.array([item[column].timestamp() for item in items], dtype=np.float64)
+            order = np.argsort(values, kind="stable").astype(np.int32)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(self.size, dtype=np.int32)
+            self.orders[column], self.ranks[column] = order, rank
+
+        rows_by_tag: dict[str, list[int]] = {}
+        for row, item in enumerate(items):
+            for tag in item["tags"]:
+                rows_by_tag.setdefault(tag, []).append(row)
+        self.bitmaps: dict[str, np.ndarray] = {}
+        for tag, rows in rows_by_tag.items():
+            bits = np.zeros(self.size, dtype=bool)
+            bits[rows] = True
+            self.bitmaps[tag] = np.packbits(bits)
+
+    def query(self, order_by: str, offset: int, limit: int, tags: tuple[str, ...] | None = None) -> tuple[int, list[dict]]:
+        order = self.orders[order_by]
+        if not tags:
+            rows = order[offset : offset + limit]
+            return self.size, [self.items[row] for row in rows.tolist()]
+
+        bitmap = None
+        for tag in dict.fromkeys(tags):
+            tag_bitmap = self.bitmaps.get(tag)
+            if tag_bitmap is None:
+                return 0, [] # nothing has this tag, so nothing has all of them
+            bitmap = tag_bitmap if bitmap is None else bitmap & tag_bitmap
+        matches = np.flatnonzero(np.unpackbits(bitmap, count=self.size))
+
+        need = offset + limit
+        ranks = self.ranks[order_by][matches]
+        if need < len(ranks):
+            ranks = ranks[np.argpartition(ranks, need - 1)[:need]] # the `need` first in order, unsorted
+        page = order[np.sort(ranks)[offset:need]]
+        return len(matches), [self.items[row] for row in page.tolist()]
+
+
+def demo_items(count: int, seed: int = 7) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    all_tags = np.array(["sale", "new", "popular", "clearance", "featured", "limited"])
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    items = []
+    for i in range(count):
+        created_at = start + timedelta(minutes=int(rng.integers(0, 400_000)))
+        items.append({
+            "id": i,
+            "name": f"Item {i}",
+            "created_at": created_at,
+            "updatedat": created_at + timedelta(minutes=int(rng.integers(0, 50_000))),
+            "tags": all_tags[rng.random(len(all_tags)) < 0.3].tolist(),
+        })
+    return items
+
+
+item_index = ItemIndex(demo_items(1000))
+
+
+def run_filter(filter_query) -> dict:
+    total, items = item_index.query(filter_query.order_by, filter_query.offset, filter_query.limit, filter_query.tags)
+    return {"filter": filter_query, "total": total, "items": items}
+
+
+## memoized validation of query models
+from collections import OrderedDict
+from types import UnionType
+from typing import Union, get_args, get_origin
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Depends, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+'''
+Dashboards send the same few query strings over and over, and every request
+would validate them into the model again. QueryModelCache maps the query
+string to the validated model (or to the validation errors, so repeated bad
+requests are cheap too) in a bounded LRU.
+
+Lookup is first by the raw query string, then by a canonical form (keys
+sorted, values of one key kept in order) so "?limit=5&offset=0" and
+"?offset=0&limit=5" share an entry. Cached models are frozen, and their
+repeated params are tuples, so a handler can't change the instance the next
+request gets.
+'''
+
+def is_sequence(annotation) -> bool:
+    # list[str], tuple[str, ...], and either of them | None: the query param can repeat
+    if get_origin(annotation) in (Union, UnionType):
+        return any(is_sequence(arg) for arg in get_args(annotation))
+    return get_origin(annotation) in (list, tuple)
+
+
+class QueryModelCache:
+    def __init__(self, model: type[BaseModel], maxsize: int = 1024):
+        self.model = model
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, BaseModel | list[dict]] = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+        self.list_fields = {name for name, field in model.model_fields.items() if is_sequence(field.annotation)}
+
+    def _get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def validate(self, params: list[tuple[str, str]]) -> BaseModel | list[dict]:
+        # same extraction as FastAPI: list fields get every value, others the last one
+        data: dict = {}
+        for key, value in params:
+            if key in self.list_fields:
+                data.setdefault(key, []).append(value)
+            else:
+                data[key] = value
+        try:
+            return self.model.model_validate(data)
+        except ValidationError as exc:
+            return [{**error, "loc": ("query", *error["loc"])} for error in exc.errors(include_url=False)]
+
+    def lookup(self, query_string: str) -> BaseModel | list[dict]:
+        entry = self._get(query_string)
+        if entry is None:
+            params = parse_qsl(query_string, keep_blank_values=True)
+            canonical = urlencode(sorted(params, key=lambda pair: pair[0]))
+            entry = self._get(canonical)
+            if entry is None:
+                self.misses += 1
+                entry = self.validate(params)
+                self._put(canonical, entry)
+            else:
+                self.hits += 1
+            if query_string != canonical:
+                self._put(query_string, entry) # next time the raw string hits directly
+        else:
+            self.hits += 1
+        return entry
+
+    async def dependency(self, request: Request) -> BaseModel:
+        # async so FastAPI calls it inline instead of sending it to the threadpool
+        entry = self.lookup(request.scope["query_string"].decode("latin-1"))
+        if isinstance(entry, list):
+            raise RequestValidationError(entry)
+        return entry
+
+    def openapi_parameters(self) -> list[dict]:
+        # the dependency reads the raw request, so describe the query params for /docs ourselves
+        schema = self.model.model_json_schema()
+        return [
+            {"name": name, "in": "query", "required": name in schema.get("required", []), "schema": prop}
+            for name, prop in schema["properties"].items()
+        ]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
 class FilterParams(BaseModel):
+    model_config = {"frozen": True} # instances are shared through the cache
+
     limit: int = Field(10, ge=1, le=100)  # limit between 1 and 100
     offset: int = Field(0, ge=0)  # offset must be non-negative
     order_by: Literal["created_at", "updatedat"] = "created_at"
-    tags: list[str] = None  # optional list of tags
+    tags: tuple[str, ...] | None = None  # optional tags, a tuple so the shared instance can't be changed
+
+filter_params_cache = QueryModelCache(FilterParams)
     
-@app.get("/items/")
+@app.get("/items/", openapi_extra={"parameters": filter_params_cache.openapi_parameters()})
 async def read_items(
     filter_query: Annotated[
-        FilterParams, # use FilterParams model to parse and validate query parameters
-        Query(),
+        FilterParams, # FilterParams validated once per distinct query string, then served from the cache
+        Depends(filter_params_cache.dependency),
     ]
 ):
-    return filter_query
+    return run_filter(filter_query)
 
 ## Forbid Extra Query Parameters
 class StrictFilterParams(BaseModel):
-    model_config = {"extra": "forbid"}  # forbid extra data in the query parameters, raise validation error if any extra parameter is provided
+    model_config = {"extra": "forbid", "frozen": True}  # forbid extra data in the query parameters, raise validation error if any extra parameter is provided
     
     limit: int = Field(10, ge=1, le=100)  # limit between 1 and 100
     offset: int = Field(0, ge=0)  # offset must be non-negative
     order_by: Literal["created_at", "updatedat"] = "created_at"
-    tags: list[str] = None  # optional list of tags
+    tags: tuple[str, ...] | None = None  # optional tags, a tuple so the shared instance can't be changed
+
+strict_filter_params_cache = QueryModelCache(StrictFilterParams)
     
-@app.get("/strict-items/")
+@app.get("/strict-items/", openapi_extra={"parameters": strict_filter_params_cache.openapi_parameters()})
 async def read_strict_items(
     filter_query: Annotated[
-        StrictFilterParams, # use StrictFilterParams model to parse and validate query parameters
-        Query(),
+        StrictFilterParams, # extra params are rejected, and that rejection is cached too
+        Depends(strict_filter_params_cache.dependency),
     ]
 ):
-    return filter_query
\ No newline at end of file
+    return run_filter(filter_query)
+
+
+@app.get("/query-cache-stats/")
+async def read_query_cache_stats():
+    return {
+        "FilterParams": filter_params_cache.stats(),
+        "StrictFilterParams": strict_filter_params_cache.stats(),
+    }
@@ -1,13 +1,166 @@
 # Body - Multiple Parameters
 
+## write-behind item store (PUT and GET /items/{item_id})
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+
+'''
+PUT /items/{item_id} answers as soon as the item is in the store's pending
+queue. The queue is a dict, so 10 writes to the same item_id inside one flush
+window become ONE row write. A background task flushes the queue to a SQLite
+file in WAL mode every flush_interval_ms, all pending items in ONE transaction
+(group commit) instead of one commit per request.
+Reads look at the pending writes first, then at the batch being committed,
+then at the file: a GET right after a PUT sees the new item.
+Trade-off: an acknowledged write that isn't flushed yet (at most
+flush_interval_ms worth) is lost if the process crashes. Shutdown flushes everything.
+'''
+
+ITEMS_DB = os.environ.get("ITEMS_DB", "items_08.db") # sqlite file behind PUT/GET /items/{item_id}, one per tutorial
+MAX_ITEM_ID = 2**63 - 1 # sqlite INTEGER is a signed 64-bit int, a bigger id can't be bound
+
+logger = logging.getLogger("items.store")
+
+
+class WriteBehindStore:
+    def __init__(self, path: str, flush_interval_ms: float = 5.0, max_pending: int = 10_000):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending # past this, writers wait for a flush (backpressure)
+        self.pending: dict[int, str] = {} # item_id -> item json, the latest write wins
+        self.flushing: dict[int, str] = {} # the batch being committed right now
+        self.stats = {"writes": 0, "coalesced": 0, "flushes": 0, "rows_written": 0, "largest_flush": 0, "rows_dropped": 0}
+        self.writer: sqlite3.Connection | None = None # only used from the flush thread
+        self.reader: sqlite3.Connection | None = None # only used from the event loop
+        self.lock: asyncio.Lock | None = None
+        self.wake: asyncio.Event | None = None
+        self.flusher: asyncio.Task | None = None
+
+    def open(self):
+        self.writer = sqlite3.connect(self.path, check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode=WAL") # readers don't block the writer and vice versa
+        self.writer.execute("PRAGMA synchronous=NORMAL") # with WAL: no fsync per commit, still crash-safe
+        self.writer.execute("CREATE TABLE IF NOT EXISTS items (item_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self.writer.commit()
+        self.reader = sqlite3.connect(self.path, isolation_level=None) # autocommit: every read sees the last commit
+
+    async def start(self):
+        # the lock/event are created here so they belong to the running event loop
+        self.open()
+        self.lock = asyncio.Lock()
+        self.wake = asyncio.Event()
+        self.flusher = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.flusher.cancel()
+        try:
+            await self.flusher
+        except asyncio.CancelledError:
+            pass
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("final flush failed, %d writes not saved", len(self.pending))
+        self.reader.close()
+        self.writer.close()
+
+    async def put(self, item_id: int, data: str):
+        if len(self.pending) >= self.max_pending:
+            await self.flush() # the disk is behind: this writer pays for the group commit
+        self.stats["writes"] += 1
+        if item_id in self.pending:
+            self.stats["coalesced"] += 1
+        self.pending[item_id] = data
+        self.wake.set()
+
+    def get(self, item_id: int) -> dict | None:
+        data = self.pending.get(item_id) or self.flushing.get(item_id)
+        if data is None:
+            row = self.reader.execute("SELECT data FROM items WHERE item_id = ?", (item_id,)).fetchone()
+            data = row and row[0]
+        return json.loads(data) if data else None
+
+    async def run(self):
+        while True:
+            await self.wake.wait()
+            await asyncio.sleep(self.flush_interval) # the flush window, more writes join the batch
+            self.wake.clear()
+            try:
+                await self.flush()
+            except Exception: # whatever it is, the flusher keeps running
+                logger.exception("flush failed, %d writes will be retried", len(self.pending))
+                self.wake.set() # the batch went back to pending, retry after the next window
+
+    async def flush(self):
+        async with self.lock: # one transaction at a time on the writer connection
+            if not self.pending:
+                return
+            self.flushing, self.pending = self.pending, {}
+            try:
+                dropped = await asyncio.to_thread(self.write, list(self.flushing.items()))
+            except BaseException:
+                self.pending = {**self.flushing, **self.pending} # newer writes win
+                raise
+            finally:
+                batch_size = len(self.flushing)
+                self.flushing = {}
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += batch_size - dropped
+            self.stats["rows_dropped"] += dropped
+            self.stats["largest_flush"] = max(self.stats["largest_flush"], batch_size)
+
+    UPSERT = "INSERT INTO items (item_id, data) VALUES (?, ?) ON CONFLICT (item_id) DO UPDATE SET data = excluded.data"
+
+    def write(self, rows: list[tuple[int, str]]) -> int:
+        # returns how many rows were dropped. OperationalError (locked, disk full, I/O)
+        # is about the file, not the rows: it's raised and the whole batch is retried
+        try:
+            with self.writer: # one transaction (and one commit) for the whole batch
+                self.writer.executemany(self.UPSERT, rows)
+            return 0
+        except sqlite3.OperationalError:
+            raise
+        except Exception:
+            pass # some row can't be written, find out which
+        dropped = 0
+        with self.writer: # still one commit, each row behind its own savepoint
+            self.writer.execute("BEGIN") # else releasing the first savepoint would commit
+            for row in rows:
+                self.writer.execute("SAVEPOINT item_row")
+                try:
+                    self.writer.execute(self.UPSERT, row)
+                except sqlite3.OperationalError:
+                    raise
+                except Exception:
+                    self.writer.execute("ROLLBACK TO item_row")
+                    logger.exception("dropping the write to item %r, it can't be stored", row[0])
+                    dropped += 1
+                self.writer.execute("RELEASE item_row")
+        return dropped
+
+
+store = WriteBehindStore(ITEMS_DB)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await store.start()
+    yield
+    await store.stop()
+
+
 ## Mix Path, Query and body parameters
 
 from typing import Annotated
 
-from fastapi import FastAPI, Path
+from fastapi import FastAPI, HTTPException, Path
 from pydantic import BaseModel
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 class Item(BaseModel):
@@ -23,6 +176,7 @@ async def update_item(
         Path(
             title="The ID of the item to update",
             ge=1,  # greater than or equal to 1
+            le=MAX_ITEM_ID,  # the store's sqlite key is a 64-bit int
         ),
     ],
     q: str | None = None,  # optional query parameter q of type str or None, default is None
@@ -32,9 +186,23 @@ async def update_item(
     if q:
         result.update({"q": q})
     if item:
+        await store.put(item_id, item.model_dump_json()) # acknowledged once queued, flushed in the background
         result.update({"item": item})
     return result
 
+
+@app.get("/items/{item_id}")
+async def read_item(item_id: Annotated[int, Path(ge=-MAX_ITEM_ID - 1, le=MAX_ITEM_ID)]):
+    item = store.get(item_id) # pending writes included
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"item_id": item_id, "item": item}
+
+
+@app.get("/items-store-stats/")
+async def read_store_stats():
+    return {**store.stats, "pending": len(store.pending)}
+
 ## Multiple body parameters
 
 class User(BaseModel):
@@ -2,10 +2,282 @@
 
 from typing import Annotated
 
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, HTTPException, Path
 from pydantic import BaseModel, Field
 
-app = FastAPI()
+
+## write-behind item store (PUT and GET /items/{item_id})
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+
+'''
+Same store as in 08_body_multiple_params.py: PUTs are acknowledged once they
+sit in the pending dict (repeated writes to one item_id coalesce), a background
+task commits them to a WAL-mode SQLite file in batches, reads check pending
+writes before the file.
+'''
+
+ITEMS_DB = os.environ.get("ITEMS_DB", "items_09.db") # sqlite file behind PUT/GET /items/{item_id}, one per tutorial
+MAX_ITEM_ID = 2**63 - 1 # sqlite INTEGER is a signed 64-bit int, a bigger id can't be bound
+
+logger = logging.getLogger("items.store")
+
+
+class WriteBehindStore:
+    def __init__(self, path: str, flush_interval_ms: float = 5.0, max_pending: int = 10_000):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending # past this, writers wait for a flush (backpressure)
+        self.pending: dict[int, str] = {} # item_id -> item json, the latest write wins
+        self.flushing: dict[int, str] = {} # the batch being committed right now
+        self.stats = {"writes": 0, "coalesced": 0, "flushes": 0, "rows_written": 0, "largest_flush": 0, "rows_dropped": 0}
+        self.writer: sqlite3.Connection | None = None # only used from the flush thread
+        self.reader: sqlite3.Connection | None = None # only used from the event loop
+        self.lock: asyncio.Lock | None = None
+        self.wake: asyncio.Event | None = None
+        self.flusher: asyncio.Task | None = None
+
+    def open(self):
+        self.writer = sqlite3.connect(self.path, check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode=WAL") # readers don't block the writer and vice versa
+        self.writer.execute("PRAGMA synchronous=NORMAL") # with WAL: no fsync per commit, still crash-safe
+        self.writer.execute("CREATE TABLE IF NOT EXISTS items (item_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        self.writer.commit()
+        self.reader = sqlite3.connect(self.path, isolation_level=None) # autocommit: every read sees the last commit
+
+    async def start(self):
+        # the lock/event are created here so they belong to the running event loop
+        self.open()
+        self.lock = asyncio.Lock()
+        self.wake = asyncio.Event()
+        self.flusher = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.flusher.cancel()
+        try:
+            await self.flusher
+        except asyncio.CancelledError:
+            pass
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("final flush failed, %d writes not saved", len(self.pending))
+        self.reader.close()
+        self.writer.close()
+
+    async def put(self, item_id: int, data: str):
+        if len(self.pending) >= self.max_pending:
+            await self.flush() # the disk is behind: this writer pays for the group commit
+        self.stats["writes"] += 1
+        if item_id in self.pending:
+            self.stats["coalesced"] += 1
+        self.pending[item_id] = data
+        self.wake.set()
+
+    def get(self, item_id: int) -> dict | None:
+        data = self.pending.get(item_id) or self.flushing.get(item_id)
+        if data is None:
+            row = self.reader.execute("SELECT data FROM items WHERE item_id = ?", (item_id,)).fetchone()
+            data = row and row[0]
+        return json.loads(data) if data else None
+
+    async def run(self):
+        while True:
+            await self.wake.wait()
+            await asyncio.sleep(self.flush_interval) # the flush window, more writes join the batch
+            self.wake.clear()
+            try:
+                await self.flush()
+            except Exception: # whatever it is, the flusher keeps running
+                logger.exception("flush failed, %d writes will be retried", len(self.pending))
+                self.wake.set() # the batch went back to pending, retry after the next window
+
+    async def flush(self):
+        async with self.lock: # one transaction at a time on the writer connection
+            if not self.pending:
+                return
+            self.flushing, self.pending = self.pending, {}
+            try:
+                dropped = await asyncio.to_thread(self.write, list(self.flushing.items()))
+            except BaseException:
+                self.pending = {**self.flushing, **self.pending} # newer writes win
+                raise
+            finally:
+                batch_size = len(self.flushing)
+                self.flushing = {}
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += batch_size - dropped
+            self.stats["rows_dropped"] += dropped
+            self.stats["largest_flush"] = max(self.stats["largest_flush"], batch_size)
+
+    UPSERT = "INSERT INTO items (item_id, data) VALUES (?, ?) ON CONFLICT (item_id) DO UPDATE SET data = excluded.data"
+
+    def write(self, rows: list[tuple[int, str]]) -> int:
+        # returns how many rows were dropped. OperationalError (locked, disk full, I/O)
+        # is about the file, not the rows: it's raised and the whole batch is retried
+        try:
+            with self.writer: # one transaction (and one commit) for the whole batch
+                self.writer.executemany(self.UPSERT, rows)
+            return 0
+        except sqlite3.OperationalError:
+            raise
+        except Exception:
+            pass # some row can't be written, find out which
+        dropped = 0
+        with self.writer: # still one commit, each row behind its own savepoint
+            self.writer.execute("BEGIN") # else releasing the first savepoint would commit
+            for row in rows:
+                self.writer.execute("SAVEPOINT item_row")
+                try:
+                    self.writer.execute(self.UPSERT, row)
+                except sqlite3.OperationalError:
+                    raise
+                except Exception:
+                    self.writer.execute("ROLLBACK TO item_row")
+                    logger.exception("dropping the write to item %r, it can't be stored", row[0])
+                    dropped += 1
+                self.writer.execute("RELEASE item_row")
+        return dropped
+
+
+store = WriteBehindStore(ITEMS_DB)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await store.start()
+    yield
+    await store.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+## body budgets: reject oversized bodies before reading them
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+'''
+FastAPI reads the whole body into memory before validation can say that
+description is longer than 300 characters. Endpoints marked with
+@body_budget() get a maximum body size, set explicitly or derived from the
+body model's constraints (max_length, max_items, ...: the biggest JSON the
+model could accept, plus BODY_BUDGET_SLACK for whitespace). Over budget:
+- Content-Length too big -> 413 before reading a single byte
+- no/false Content-Length (chunked) -> 413 as soon as the received bytes pass
+  the budget, the rest is never read
+So at most max_body_bytes per request are buffered, however big the upload.
+If the model has an unbounded part (a str without max_length, a list without
+max_items, extra keys...) nothing can be derived: the endpoint needs an
+explicit max_bytes, or str_bytes, the size this route assumes for a str
+without max_length. That is the route's own limit, the model and its
+OpenAPI schema stay as they are. Fields that the model would ignore count too: a valid
+body padded with unknown keys can get a 413.
+'''
+
+BODY_BUDGET_SLACK = 1024 # bytes allowed on top of the biggest compact JSON, for whitespace/indentation
+# worst-case JSON size of values without a maxLength/maxItems
+NUMBER_BYTES = 32
+FORMAT_BYTES = {"date-time": 64, "date": 32, "time": 32, "duration": 64, "uuid": 38}
+
+
+def body_budget(max_bytes: int | None = None, *, str_bytes: int | None = None):
+    def mark(endpoint):
+        endpoint.body_budget = max_bytes or "derived"
+        endpoint.body_budget_str_bytes = str_bytes # JSON bytes assumed for a str without max_length
+        return endpoint
+    return mark
+
+
+def max_json_bytes(schema: dict, defs: dict, str_bytes: int | None = None) -> int | None:
+    # the biggest compact JSON a value matching the schema can take, None when unbounded
+    if "$ref" in schema:
+        return max_json_bytes(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, str_bytes)
+    if "const" in schema or "enum" in schema:
+        return max(len(json.dumps(value)) for value in schema.get("enum", [schema.get("const")]))
+    options = schema.get("anyOf") or schema.get("oneOf")
+    if options:
+        sizes = [max_json_bytes(option, defs, str_bytes) for option in options]
+        return None if None in sizes else max(sizes)
+    kind = schema.get("type")
+    if kind == "string":
+        if "maxLength" in schema:
+            return 2 + 12 * schema["maxLength"] # quotes + every char escaped as a \uXXXX\uXXXX surrogate pair
+        return FORMAT_BYTES.get(schema.get("format"), str_bytes)
+    if kind in ("integer", "number"):
+        return NUMBER_BYTES
+    if kind == "boolean":
+        return 5
+    if kind == "null":
+        return 4
+    if kind == "array" and "maxItems" in schema:
+        item = max_json_bytes(schema.get("items", {}), defs, str_bytes)
+        return None if item is None else 2 + schema["maxItems"] * (item + 1)
+    if kind == "object" and "properties" in schema:
+        size = 2
+        for name, property_schema in schema.get("properties", {}).items():
+            value = max_json_bytes(property_schema, defs, str_bytes)
+            if value is None:
+                return None
+            size += len(json.dumps(name)) + 1 + value + 1 # "name":value,
+        return size
+    return None
+
+
+class BodyBudgetRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        budget = getattr(endpoint, "body_budget", None)
+        self.max_body_bytes = self.derive_body_budget() if budget == "derived" else budget
+        if budget == "derived" and self.max_body_bytes is None:
+            raise ValueError(f"{self.name}: the body model is unbounded, use @body_budget(max_bytes=...) or str_bytes=...")
+
+    def derive_body_budget(self) -> int | None:
+        fields = self.dependant.body_params
+        if not fields:
+            return None
+        str_bytes = getattr(self.endpoint, "body_budget_str_bytes", None)
+        sizes = {}
+        for field in fields:
+            schema = TypeAdapter(field.field_info.annotation).json_schema()
+            sizes[field.alias] = max_json_bytes(schema, schema.get("$defs", {}), str_bytes)
+            if sizes[field.alias] is None:
+                return None
+        if len(fields) == 1 and not self._embed_body_fields:
+            size = sizes[fields[0].alias]
+        else: # {"item": {...}, "user": {...}}
+            size = 2 + sum(len(json.dumps(alias)) + 1 + value + 1 for alias, value in sizes.items())
+        return size + BODY_BUDGET_SLACK
+
+    async def handle(self, scope, receive, send):
+        if self.max_body_bytes is None:
+            return await super().handle(scope, receive, send)
+        limit = self.max_body_bytes
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                raise HTTPException(status_code=413, detail=f"Request body is larger than {limit} bytes")
+        received = 0
+
+        async def receive_within_budget():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit: # a lying or missing Content-Length, stop reading here
+                    raise HTTPException(status_code=413, detail=f"Request body is larger than {limit} bytes")
+            return message
+
+        await super().handle(scope, receive_within_budget, send)
+
+
+app.router.route_class = BodyBudgetRoute # only changes endpoints marked with @body_budget
+
+
+NAME_BYTES = 4096 # JSON size allowed for Item.name on PUT /items/{item_id}, the model itself doesn't limit it
 
 
 class Item(BaseModel):
@@ -23,8 +295,9 @@ class Item(BaseModel):
     
     
 @app.put("/items/{item_id}")
+@body_budget(str_bytes=NAME_BYTES) # derived from Item: description max_length, numbers, NAME_BYTES for name -> 8837 bytes
 async def update_item(
-    item_id: int,
+    item_id: Annotated[int, Path(ge=-MAX_ITEM_ID - 1, le=MAX_ITEM_ID)], # the store's sqlite key is a 64-bit int
     item: Annotated[
         Item,
         Body(
@@ -32,5 +305,19 @@ async def update_item(
         ),
     ]
 ):
+    await store.put(item_id, item.model_dump_json()) # acknowledged once queued, flushed in the background
     results = {"item_id": item_id, "item": item}
-    return results
\ No newline at end of file
+    return results
+
+
+@app.get("/items/{item_id}")
+async def read_item(item_id: Annotated[int, Path(ge=-MAX_ITEM_ID - 1, le=MAX_ITEM_ID)]):
+    item = store.get(item_id) # pending writes included
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"item_id": item_id, "item": item}
+
+
+@app.get("/items-store-stats/")
+async def read_store_stats():
+    return {**store.stats, "pending": len(store.pending)}
\ No newline at end of file
@@ -3,7 +3,70 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 
-app = FastAPI()
+
+## precomputed, pre-gzipped /openapi.json
+import gzip
+import hashlib
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+'''
+FastAPI builds the OpenAPI schema on the first /openapi.json hit (all these
+examples included), so the first client pays for it, in every worker.
+Here the document is built ONCE at startup, or not at all when OPENAPI_SNAPSHOT
+points to a snapshot written at build time:
+    python 02_tutorial/10_declare_request_example_data.py snapshot openapi.json.gz
+    OPENAPI_SNAPSHOT=openapi.json.gz fastapi run 02_tutorial/10_declare_request_example_data.py
+It's kept as bytes, plain and gzipped, with an ETag: /openapi.json only
+picks the right bytes (or answers 304), nothing is serialized per request.
+The snapshot is NOT checked against the code, rebuild it whenever routes/models change.
+'''
+
+OPENAPI_SNAPSHOT = os.environ.get("OPENAPI_SNAPSHOT") # gzipped openapi.json written by the snapshot command
+
+
+class OpenAPIDocument:
+    def __init__(self):
+        self.body = b""
+        self.gzipped = b""
+        self.etag = ""
+
+    def build(self, app: FastAPI):
+        # same bytes as FastAPI's own /openapi.json (JSONResponse)
+        self.set(json.dumps(app.openapi(), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode())
+
+    def load(self, path: str):
+        self.gzipped = Path(path).read_bytes()
+        self.body = gzip.decompress(self.gzipped)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+    def set(self, body: bytes):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0) # mtime=0: same bytes on every build
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def write(self, path: str):
+        Path(path).write_bytes(self.gzipped)
+
+
+openapi_document = OpenAPIDocument()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # every route is registered by now
+    if OPENAPI_SNAPSHOT and Path(OPENAPI_SNAPSHOT).exists():
+        openapi_document.load(OPENAPI_SNAPSHOT)
+    else:
+        openapi_document.build(app)
+    yield
+
+
+# FastAPI's lazy /openapi.json (and the /docs and /redoc pointing to it) are replaced at the end of the file
+app = FastAPI(lifespan=lifespan, openapi_url=None)
 
 
 class Item(BaseModel):
@@ -138,6 +201,7 @@ async def update_item_with_openapi_examples(
         Body(
             openapi_examples={
                 "normal": {
+                    "x-weight": 8, # share of this example in 03_benchmarks/openapi_loadgen.py, most real traffic
                     "summary": "A normal example",
                     "description": "A **normal** item works correctly.",
                     "value": {
@@ -148,6 +212,7 @@ async def update_item_with_openapi_examples(
                     },
                 },
                 "converted": {
+                    "x-weight": 3,
                     "summary": "An example with converted data",
                     "description": "FastAPI can convert price `strings` to actual `numbers` automatically",
                     "value": {
@@ -156,6 +221,7 @@ async def update_item_with_openapi_examples(
                     },
                 },
                 "invalid": {
+                    "x-weight": 1,
                     "summary": "Invalid data is rejected with an error",
                     "value": {
                         "name": "Baz",
@@ -167,4 +233,65 @@ async def update_item_with_openapi_examples(
     ],
 ):
     results = {"item_id": item_id, "item": item}
-    return results
\ No newline at end of file
+    return results
+
+
+## serving the precomputed document
+from fastapi import Request, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    # gzip (or x-gzip, or *) listed with a q-value above 0: "gzip;q=0" refuses it
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip()] = q
+    q = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return q > 0
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/"x" matches "x". "*" matches any current document
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json(request: Request):
+    headers = {"ETag": openapi_document.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), openapi_document.etag):
+        return Response(status_code=304, headers=headers)
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        return Response(openapi_document.gzipped, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(openapi_document.body, media_type="application/json", headers=headers)
+
+
+# openapi_url=None dropped both doc pages, both come back on the precomputed document
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui():
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc():
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
+
+
+if __name__ == "__main__":
+    # python 02_tutorial/10_declare_request_example_data.py snapshot [path]
+    if sys.argv[1:2] != ["snapshot"]:
+        sys.exit("usage: python 10_declare_request_example_data.py snapshot [openapi.json.gz]")
+    path = sys.argv[2] if len(sys.argv) > 2 else "openapi.json.gz"
+    openapi_document.build(app)
+    openapi_document.write(path)
+    print(f"wrote {path}: {len(openapi_document.body)} bytes, {len(openapi_document.gzipped)} gzipped, ETag {openapi_document.etag}")
@@ -12,14 +12,498 @@ additional data types:
 - decimal: high-precision decimal number. handle the same as float.
 '''
 
+## hierarchical timer wheel: scheduling start_process / repeat_at
+import asyncio
+import heapq
+import time as clock
+from collections import deque
+from contextlib import asynccontextmanager
+
+'''
+PUT /items/{item_id} registers two jobs for the item: one at start_process and,
+when repeat_at is given, one every day at that time. They sit in a hierarchical
+timing wheel (the Kafka/Varghese-Lauck design):
+- level 0 has SLOTS buckets of TICK_MS, level 1 SLOTS buckets of TICK_MS*SLOTS,
+  and so on, levels are added only when a deadline is that far away
+- a bucket is a doubly-linked list: insert and cancel are O(1), a timer is one
+  small __slots__ object (~80 bytes)
+- when time reaches a higher level bucket its timers drop to the lower levels
+  (cascade), level 0 buckets fire
+- only non-empty buckets go in a heap (a few hundred at most, not one entry
+  per timer), so the loop sleeps straight until the next one, no idle ticking
+Due jobs go to a queue served by WORKERS tasks: at most WORKERS jobs run at
+once, a slow job delays other jobs, it never delays the wheel.
+Deadlines are wall clock (naive datetimes are taken as UTC).
+'''
+
+TICK_MS = 1
+SLOTS = 512 # per level: 512ms, 262s, 37h, 2.2 years
+WORKERS = 8
+DAY_MS = 86_400_000
+
+
+class Timer:
+    __slots__ = ("deadline", "job", "period", "bucket", "prev", "next")
+
+    def __init__(self, deadline: int, job, period: int = 0):
+        self.deadline = deadline # epoch ms
+        self.job = job # async callable without arguments
+        self.period = period # ms, 0 = run once
+        self.bucket = None # the bucket holding the timer, None once fired or cancelled
+        self.prev = self.next = self
+
+
+class TimerBucket:
+    __slots__ = ("expiration", "sentinel")
+
+    def __init__(self):
+        self.expiration = -1
+        self.sentinel = Timer(-1, None) # circular list, the sentinel is both head and tail
+
+    def add(self, timer: Timer):
+        tail = self.sentinel.prev
+        timer.prev, timer.next = tail, self.sentinel
+        tail.next = self.sentinel.prev = timer
+        timer.bucket = self
+
+    def remove(self, timer: Timer):
+        timer.prev.next, timer.next.prev = timer.next, timer.prev
+        timer.prev = timer.next = timer
+        timer.bucket = None
+
+    def drain(self) -> list[Timer]:
+        timers = []
+        timer = self.sentinel.next
+        while timer is not self.sentinel:
+            following = timer.next
+            timer.prev = timer.next = timer
+            timer.bucket = None
+            timers.append(timer)
+            timer = following
+        self.sentinel.prev = self.sentinel.next = self.sentinel
+        self.expiration = -1
+        return timers
+
+
+class TimingWheel:
+    def __init__(self, tick: int, slots: int, now: int, expirations: list):
+        self.tick = tick
+        self.slots = slots
+        self.interval = tick * slots
+        self.current = now - now % tick
+        self.buckets = [TimerBucket() for _ in range(slots)]
+        self.expirations = expirations # heap of (expiration, bucket id, bucket), shared by every level
+        self.overflow: TimingWheel | None = None # next level, created on demand
+
+    def add(self, timer: Timer) -> bool:
+        # False: the timer is already due
+        if timer.deadline < self.current + self.tick:
+            return False
+        if timer.deadline < self.current + self.interval:
+            virtual = timer.deadline // self.tick
+            bucket = self.buckets[virtual % self.slots]
+            bucket.add(timer)
+            expiration = virtual * self.tick
+            if bucket.expiration != expiration: # the bucket was empty (or drained): it goes (back) in the heap
+                bucket.expiration = expiration
+                heapq.heappush(self.expirations, (expiration, id(bucket), bucket))
+            return True
+        if self.overflow is None:
+            self.overflow = TimingWheel(self.interval, self.slots, self.current, self.expirations)
+        return self.overflow.add(timer)
+
+    def advance(self, now: int):
+        if now >= self.current + self.tick:
+            self.current = now - now % self.tick
+            if self.overflow is not None:
+                self.overflow.advance(self.current)
+
+
+class TimerWheelScheduler:
+    def __init__(self, tick_ms: int = TICK_MS, slots: int = SLOTS, workers: int = WORKERS):
+        self.expirations: list = []
+        self.wheel = TimingWheel(tick_ms, slots, self.now(), self.expirations)
+        self.workers = workers
+        self.pending = 0
+        self.stats = {"scheduled": 0, "cancelled": 0, "fired": 0, "failed": 0}
+        self.lateness_ms = deque(maxlen=10_000) # most recent fire - deadline, for percentiles
+        self.ready: asyncio.Queue | None = None
+        self.wake: asyncio.Event | None = None
+        self.tasks: list[asyncio.Task] = []
+
+    @staticmethod
+    def now() -> int:
+        return clock.time_ns() // 1_000_000
+
+    def start(self):
+        # the queue/event are created here so they belong to the running event loop
+        self.ready = asyncio.Queue()
+        self.wake = asyncio.Event()
+        self.tasks = [asyncio.create_task(self.run())] + [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def schedule(self, deadline: int, job, period: int = 0) -> Timer:
+        timer = Timer(deadline, job, period)
+        self.stats["scheduled"] += 1
+        self.pending += 1
+        next_expiration = self.expirations[0][0] if self.expirations else None
+        self.add(timer)
+        if self.wake is not None and (next_expiration is None or deadline < next_expiration):
+            self.wake.set() # the loop sleeps until the old next expiration, wake it up
+        return timer
+
+    def cancel(self, timer: Timer) -> bool:
+        if timer.job is None:
+            return False # already cancelled
+        if timer.bucket is not None:
+            timer.bucket.remove(timer)
+            self.pending -= 1
+        # else: waiting for a worker (it will be skipped) or running (it won't repeat)
+        timer.job = None
+        self.stats["cancelled"] += 1
+        return True
+
+    def add(self, timer: Timer):
+        if not self.wheel.add(timer):
+            self.ready.put_nowait(timer)
+
+    async def run(self):
+        while True:
+            if not self.expirations:
+                await self.wake.wait()
+                self.wake.clear()
+                continue
+            expiration, _, bucket = self.expirations[0]
+            delay = expiration - self.now()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), delay / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                self.wake.clear()
+                continue
+            heapq.heappop(self.expirations)
+            if bucket.expiration != expiration:
+                continue # stale entry, the bucket was drained and reused since
+            self.wheel.advance(expiration)
+            for timer in bucket.drain():
+                self.add(timer) # cascades to a lower level, or is due
+
+    async def work(self):
+        while True:
+            timer = await self.ready.get()
+            self.pending -= 1
+            if timer.job is None:
+                continue # cancelled while waiting for a worker
+            fired = self.now()
+            self.lateness_ms.append(fired - timer.deadline)
+            try:
+                await timer.job()
+                self.stats["fired"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+            if timer.period and timer.job is not None:
+                # next run: the next period after now (missed runs are skipped, not replayed)
+                timer.deadline += max(1, (fired - timer.deadline) // timer.period + 1) * timer.period
+                self.pending += 1
+                self.add(timer)
+
+    def snapshot(self) -> dict:
+        lateness = sorted(self.lateness_ms) or [0]
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "levels": self.levels(),
+            "lateness_ms": {
+                "p50": lateness[len(lateness) // 2],
+                "p99": lateness[min(len(lateness) - 1, len(lateness) * 99 // 100)],
+                "max": lateness[-1],
+            },
+        }
+
+    def levels(self) -> int:
+        count, wheel = 0, self.wheel
+        while wheel is not None:
+            count, wheel = count + 1, wheel.overflow
+        return count
+
+
+scheduler = TimerWheelScheduler()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    scheduler.start()
+    yield
+    await scheduler.stop()
+
+
 ## examples
-from datetime import datetime, time, timedelta
+from datetime import datetime, time, timedelta, timezone
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import Body, FastAPI, Body
+from fastapi import Body, FastAPI, Body, Query
+
+app = FastAPI(lifespan=lifespan)
+
+
+## jobs of each item
+def epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def next_daily(at: time, now: datetime) -> datetime:
+    # the next time of day `at`, today or tomorrow
+    tz = at.tzinfo or timezone.utc
+    now = now.astimezone(tz)
+    candidate = datetime.combine(now.date(), at.replace(tzinfo=None), tzinfo=tz)
+    return candidate if candidate > now else candidate + timedelta(days=1)
+
+
+item_timers: dict[UUID, list[Timer]] = {} # item -> its pending start_process and its repeat_at timers
+processed = deque(maxlen=1000) # most recent job runs
+
+
+def process_job(item_id: UUID, kind: str):
+    async def job():
+        processed.append({"item_id": item_id, "kind": kind, "at": datetime.now(timezone.utc)})
+    return job
+
+
+def forget_timer(item_id: UUID, timer: Timer):
+    # a run-once timer that fired has nothing left to cancel
+    timers = item_timers.get(item_id)
+    if timers is None or not any(t is timer for t in timers):
+        return # already replaced by a newer PUT, or its jobs were cancelled
+    timers[:] = [t for t in timers if t is not timer]
+    if not timers:
+        del item_timers[item_id]
+
+
+def schedule_once(item_id: UUID, deadline: int, kind: str) -> Timer:
+    job = process_job(item_id, kind)
+
+    async def run_once():
+        try:
+            await job()
+        finally:
+            forget_timer(item_id, timer)
+
+    timer = scheduler.schedule(deadline, run_once) # runs on a worker, after this returns
+    return timer
+
+
+def schedule_item(item_id: UUID, start_process: datetime, repeat_at: time | None):
+    for timer in item_timers.pop(item_id, []): # a new PUT replaces the item's jobs
+        scheduler.cancel(timer)
+    timers = [schedule_once(item_id, epoch_ms(start_process), "start_process")]
+    if repeat_at is not None:
+        first = next_daily(repeat_at, datetime.now(timezone.utc))
+        timers.append(scheduler.schedule(epoch_ms(first), process_job(item_id, "repeat_at"), period=DAY_MS))
+    item_timers[item_id] = timers
+
+
+## columnar time index: which items are active between two datetimes
+import numpy as np
+
+'''
+Items are kept in columns, no python object per item:
+- keys: the raw 16 bytes of each UUID (two uint64 words)
+- starts / ends: datetime64[us] columns (UTC)
+- hash index: open-addressing table of row numbers (int32), linear probing, load <= 0.5
+- start index: row numbers sorted by start, plus the sorted starts themselves
+  for binary search. New rows and rows whose dates changed sit in a small tail
+  that is scanned, the index is re-sorted once the tail gets big
+"Active between t1 and t2" means start < t2 and end > t1. Every such item
+starts in [t1 - longest duration, t2), so that's one binary-searched slice of
+the start index, only the slice is checked against the end column. One very
+long item widens the slice for every query (see max_duration).
+'''
+
+MASK64 = (1 << 64) - 1
+INSERT_CHUNK = 1 << 20 # rows per vectorized hash insert round
+
+
+def hash_keys(keys: np.ndarray) -> np.ndarray:
+    # vectorized 64-bit hash of (n, 2) uint64 keys
+    h = keys[:, 0] * np.uint64(0x9E3779B97F4A7C15)
+    h ^= keys[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F)
+    h ^= h >> np.uint64(31)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(29)
+    return h
+
+
+def hash_key(high: int, low: int) -> int:
+    # same hash as hash_keys() for a single key, in plain python
+    h = ((high * 0x9E3779B97F4A7C15) & MASK64) ^ ((low * 0xC2B2AE3D27D4EB4F) & MASK64)
+    h ^= h >> 31
+    h = (h * 0x94D049BB133111EB) & MASK64
+    return h ^ (h >> 29)
+
+
+def uuid_words(item_id: UUID) -> tuple[int, int]:
+    words = np.frombuffer(item_id.bytes, dtype=np.uint64) # same layout as the keys column
+    return int(words[0]), int(words[1])
+
+
+def to_datetime64(value: datetime) -> np.datetime64:
+    if value.tzinfo is not None: # naive datetimes are taken as UTC
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "us")
+
+
+class ItemTimeIndex:
+    def __init__(self, capacity: int = 1024):
+        self.keys = np.zeros((capacity, 2), dtype=np.uint64)
+        self.starts = np.zeros(capacity, dtype="datetime64[us]")
+        self.ends = np.zeros(capacity, dtype="datetime64[us]")
+        self.size = 0
+        self.slots = np.zeros(1 << (2 * capacity - 1).bit_length(), dtype=np.int32) # hash table (power of 2), row + 1 (0 = empty)
+        self.by_start = np.zeros(0, dtype=np.int32) # rows [0, sorted_upto) in start order
+        self.sorted_starts = np.zeros(0, dtype="datetime64[us]") # starts[by_start], for searchsorted
+        self.sorted_upto = 0
+        self.moved: list[int] = [] # sorted rows whose dates changed since the last sort
+        self.max_duration = np.timedelta64(0, "us")
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed: int):
+        capacity = len(self.starts)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.keys = np.resize(self.keys, (capacity, 2))
+        self.starts = np.resize(self.starts, capacity)
+        self.ends = np.resize(self.ends, capacity)
+
+    def _find_row(self, high: int, low: int) -> int:
+        mask = len(self.slots) - 1
+        slot = hash_key(high, low) & mask
+        while True:
+            row = int(self.slots[slot]) - 1
+            if row < 0:
+                return -1
+            if int(self.keys[row, 0]) == high and int(self.keys[row, 1]) == low:
+                return row
+            slot = (slot + 1) & mask
+
+    def _insert_rows(self, begin: int, end: int):
+        # vectorized linear probing, same rounds as BookCatalog in 05_query_params_str_validations.py,
+        # a chunk of rows at a time so the temporaries stay small next to the columns
+        table_size = len(self.slots)
+        for chunk in range(begin, end, INSERT_CHUNK):
+            rows = np.arange(chunk, min(chunk + INSERT_CHUNK, end), dtype=np.int32)
+            positions = (hash_keys(self.keys[rows]) & np.uint64(table_size - 1)).astype(np.int64)
+            while rows.size:
+                free = np.flatnonzero(self.slots[positions] == 0)
+                taken_positions, first = np.unique(positions[free], return_index=True)
+                winners = free[first]
+                self.slots[taken_positions] = rows[winners] + 1
+                placed = np.zeros(rows.size, dtype=bool)
+                placed[winners] = True
+                rows = rows[~placed]
+                positions = (positions[~placed] + 1) & (table_size - 1)
+
+    def _rebuild_hash(self, table_size: int):
+        self.slots = np.zeros(table_size, dtype=np.int32)
+        self._insert_rows(0, self.size)
+
+    def _reindex_starts(self):
+        self.by_start = np.argsort(self.starts[: self.size], kind="stable").astype(np.int32)
+        self.sorted_starts = self.starts[self.by_start]
+        self.sorted_upto = self.size
+        self.moved = []
+
+    def _merge_starts(self, begin: int, end: int):
+        # rows [begin, end) are new: sort just them and merge them into the start index
+        rows = (begin + np.argsort(self.starts[begin:end], kind="stable")).astype(np.int32)
+        starts = self.starts[rows]
+        positions = np.searchsorted(self.sorted_starts, starts, side="right")
+        self.by_start = np.insert(self.by_start, positions, rows)
+        self.sorted_starts = np.insert(self.sorted_starts, positions, starts)
+        self.sorted_upto = end
+
+    def extend(self, keys: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        # bulk load: keys is (n, 2) uint64, none of them may already be in the index
+        begin, end = self.size, self.size + len(keys)
+        self._grow(end)
+        self.keys[begin:end] = keys
+        self.starts[begin:end] = starts
+        self.ends[begin:end] = ends
+        self.size = end
+        if end > begin:
+            self.max_duration = max(self.max_duration, (self.ends[begin:end] - self.starts[begin:end]).max())
+        if 2 * self.size > len(self.slots):
+            self._rebuild_hash(1 << (2 * self.size - 1).bit_length())
+        else:
+            self._insert_rows(begin, end)
+        if self.sorted_upto == begin and not self.moved:
+            self._merge_starts(begin, end)
+        else:
+            self._reindex_starts()
+
+    def put(self, item_id: UUID, start: datetime, end: datetime):
+        high, low = uuid_words(item_id)
+        start, end = to_datetime64(start), to_datetime64(end)
+        self.max_duration = max(self.max_duration, end - start)
+        row = self._find_row(high, low)
+        if row >= 0: # known item, new dates
+            self.starts[row], self.ends[row] = start, end
+            if row < self.sorted_upto:
+                self.moved.append(row) # its place in the start index is stale
+        else:
+            self._grow(self.size + 1)
+            row = self.size
+            self.keys[row] = (high, low)
+            self.starts[row], self.ends[row] = start, end
+            self.size += 1
+            if 2 * self.size > len(self.slots):
+                self._rebuild_hash(2 * len(self.slots))
+            else:
+                mask = len(self.slots) - 1
+                slot = hash_key(high, low) & mask
+                while self.slots[slot]:
+                    slot = (slot + 1) & mask
+                self.slots[slot] = row + 1
+        if self.size - self.sorted_upto + len(self.moved) > max(1024, self.size // 64):
+            self._reindex_starts() # tail too long to keep scanning
+
+    def active(self, t1: datetime, t2: datetime, limit: int) -> tuple[int, list[dict]]:
+        t1, t2 = to_datetime64(t1), to_datetime64(t2)
+        low = np.searchsorted(self.sorted_starts, t1 - self.max_duration, side="right")
+        high = np.searchsorted(self.sorted_starts, t2, side="left")
+        rows = self.by_start[low:high]
+        tail = self.size > self.sorted_upto or self.moved
+        if tail:
+            extra = np.concatenate([np.arange(self.sorted_upto, self.size, dtype=np.int32), np.array(self.moved, dtype=np.int32)])
+            rows = np.unique(np.concatenate([rows, extra])) # a moved row can be in both
+        rows = rows[(self.starts[rows] < t2) & (self.ends[rows] > t1)] # live values: stale index entries drop out here
+        if tail:
+            rows = rows[np.argsort(self.starts[rows], kind="stable")]
+        page = rows[:limit]
+        items = [
+            {
+                "item_id": UUID(bytes=key.tobytes()),
+                "start_datetime": start.replace(tzinfo=timezone.utc),
+                "end_datetime": end.replace(tzinfo=timezone.utc),
+            }
+            for key, start, end in zip(self.keys[page], self.starts[page].tolist(), self.ends[page].tolist())
+        ]
+        return len(rows), items
+
+
+time_index = ItemTimeIndex()
 
-app = FastAPI()
 
 @app.put("/items/{item_id}")
 async def read_items(
@@ -31,6 +515,8 @@ async def read_items(
 ):
     start_process = start_datetime + process_after
     duration = end_datetime - start_datetime
+    schedule_item(item_id, start_process, repeat_at)
+    time_index.put(item_id, start_datetime, end_datetime)
     return {
         "item_id": item_id,
         "start_datetime": start_datetime,
@@ -39,4 +525,26 @@ async def read_items(
         "repeat_at": repeat_at,
         "start_process": start_process,
         "duration": duration,
-    }
\ No newline at end of file
+    }
+
+
+# items active at some point between start and end, binary-searched range scan
+@app.get("/items/active/")
+async def read_active_items(
+    start: datetime,
+    end: datetime,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    total, items = time_index.active(start, end, limit)
+    return {"total": total, "items": items}
+
+
+@app.delete("/items/{item_id}/jobs")
+async def cancel_item_jobs(item_id: UUID):
+    cancelled = sum(scheduler.cancel(timer) for timer in item_timers.pop(item_id, []))
+    return {"item_id": item_id, "cancelled": cancelled}
+
+
+@app.get("/scheduler-stats/")
+async def read_scheduler_stats():
+    return {**scheduler.snapshot(), "recent": list(processed)[-10:]}
@@ -24,12 +24,193 @@ async def read_users(
 ):
     return {"Strange-Header": strange_header}
 
+## verified x_token values: a pluggable verifier behind a TTL cache
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import sys
+import time
+from typing import NamedTuple, Protocol
+
+from fastapi import Depends, HTTPException
+
+'''
+every X-Token value of a request goes through verify_tokens (a dependency):
+- the verifier is anything with `async def verify(token) -> TokenClaims | None`
+  (None: rejected). Swap it with app.dependency_overrides[get_token_verifier].
+  HMACTokenVerifier checks `<subject>.<expires>.<signature>` tokens signed
+  with TOKEN_SECRET. the app doesn't hand tokens out: issue one with
+  `TOKEN_SECRET=... python 02_tutorial/13_header_params.py token <subject>`
+- in front of it, TokenCache keeps the answers: accepted tokens for
+  POSITIVE_TTL seconds (or until they expire, if sooner), rejected ones for
+  NEGATIVE_TTL, so a replayed bad token doesn't cost a verification either
+- the tokens of a request that aren't cached are verified concurrently, and a
+  token already being verified for another request is awaited, not verified
+  twice
+one rejected token fails the request with 401.
+
+the cache is only used from the event loop: no lock. a hit is a dict lookup
+and a clock read. entries are evicted oldest-inserted first: with one TTL per
+kind, that is close to expiry order, and a hit doesn't reorder anything.
+'''
+
+TOKEN_SECRET = os.environ.get("TOKEN_SECRET", "").encode() or secrets.token_bytes(32) # unset: tokens die with the process
+TOKEN_LIFETIME = 3600 # seconds, for issued tokens
+POSITIVE_TTL = 300.0 # seconds
+NEGATIVE_TTL = 30.0 # seconds, short: a token can be rejected by a verifier that is wrong for a moment
+TOKEN_CACHE_CAPACITY = 100_000
+
+
+class TokenClaims(NamedTuple):
+    subject: str
+    expires_at: int # unix time
+
+
+class TokenVerifier(Protocol):
+    async def verify(self, token: str) -> TokenClaims | None: ...
+
+
+class HMACTokenVerifier:
+    def __init__(self, secret: bytes):
+        self.secret = secret
+
+    def sign(self, payload: bytes) -> bytes:
+        digest = hmac.new(self.secret, payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=")
+
+    def issue(self, subject: str, lifetime: int = TOKEN_LIFETIME) -> str:
+        payload = f"{subject}.{int(time.time()) + lifetime}".encode()
+        return (payload + b"." + self.sign(payload)).decode()
+
+    async def verify(self, token: str) -> TokenClaims | None:
+        # a few us of CPU: done inline, a thread hop would cost more than the hash
+        payload, _, signature = token.encode().rpartition(b".")
+        if not hmac.compare_digest(self.sign(payload), signature):
+            return None
+        subject, _, expires = payload.decode().rpartition(".")
+        expires_at = int(expires)
+        if not subject or expires_at <= time.time():
+            return None
+        return TokenClaims(subject, expires_at)
+
+
+MISSING = object() # not in the cache (None is a cached rejection)
+
+
+class TokenCache:
+    def __init__(
+        self,
+        capacity: int = TOKEN_CACHE_CAPACITY,
+        positive_ttl: float = POSITIVE_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+    ):
+        self.capacity = capacity
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.entries: dict[str, tuple[float, TokenClaims | None]] = {} # token -> (valid until, claims)
+        self.pending: dict[str, asyncio.Task] = {} # token -> its verification in flight
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, token: str):
+        # the claims, None for a rejected token, or MISSING
+        entry = self.entries.get(token)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return MISSING
+
+    def put(self, token: str, claims: TokenClaims | None):
+        if claims is None:
+            ttl = self.negative_ttl
+        else: # never trust a token past its own expiry
+            ttl = min(self.positive_ttl, claims.expires_at - time.time())
+        self.entries.pop(token, None) # re-inserted at the end: evicted last
+        self.entries[token] = (time.monotonic() + ttl, claims)
+        while len(self.entries) > self.capacity:
+            del self.entries[next(iter(self.entries))] # oldest inserted
+            self.evictions += 1
+
+    async def verify(self, verifier: TokenVerifier, token: str) -> TokenClaims | None:
+        task = self.pending.get(token)
+        if task is None:
+            task = self.pending[token] = asyncio.ensure_future(self._verify(verifier, token))
+        return await asyncio.shield(task) # one request giving up doesn't cancel it for the others
+
+    async def _verify(self, verifier: TokenVerifier, token: str) -> TokenClaims | None:
+        try:
+            try:
+                claims = await verifier.verify(token)
+            except ValueError: # malformed token
+                claims = None
+            self.put(token, claims)
+            return claims
+        finally:
+            del self.pending[token]
+
+    async def verify_all(self, verifier: TokenVerifier, tokens: list[str]) -> list[TokenClaims | None]:
+        results = [self.get(token) for token in tokens]
+        missing = [i for i, result in enumerate(results) if result is MISSING]
+        if missing:
+            verified = await asyncio.gather(*(self.verify(verifier, tokens[i]) for i in missing))
+            for i, claims in zip(missing, verified):
+                results[i] = claims
+        return results
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+token_verifier = HMACTokenVerifier(TOKEN_SECRET)
+token_cache = TokenCache()
+
+def get_token_verifier() -> TokenVerifier:
+    return token_verifier
+
+
+async def verify_tokens(
+    verifier: Annotated[TokenVerifier, Depends(get_token_verifier)],
+    x_token: Annotated[list[str] | None, Header()] = None,
+) -> list[TokenClaims]:
+    if not x_token:
+        raise HTTPException(status_code=401, detail="Missing X-Token")
+    claims = await token_cache.verify_all(verifier, x_token)
+    if None in claims:
+        raise HTTPException(status_code=401, detail="Invalid X-Token")
+    return claims
+
+
+@app.get("/token-stats/")
+async def read_token_stats():
+    return token_cache.stats()
+
+
 ## duplicate headers
 @app.get("/projects/")
 async def read_projects(
+    claims: Annotated[list[TokenClaims], Depends(verify_tokens)],
     x_token: Annotated[
         list[str] | None,
         Header()
-    ] = None
+    ] = None,
 ):
-    return {"X-Token values": x_token}
\ No newline at end of file
+    return {"X-Token values": x_token, "subjects": [c.subject for c in claims]}
+
+
+if __name__ == "__main__":
+    # python 02_tutorial/13_header_params.py token <subject>, with the server's TOKEN_SECRET
+    if sys.argv[1:2] != ["token"] or len(sys.argv) != 3:
+        sys.exit("usage: python 13_header_params.py token <subject>")
+    if not os.environ.get("TOKEN_SECRET"):
+        sys.exit("set TOKEN_SECRET to the server's secret, a token signed with a random one is useless")
+    print(token_verifier.issue(sys.argv[2]))
@@ -7,7 +7,190 @@ from typing import Annotated
 from fastapi import FastAPI, Cookie
 from pydantic import BaseModel
 
-app = FastAPI()
+
+## sessions: sharded LRU + TTL cache in front of a sqlite file
+import asyncio
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Depends, Response
+
+'''
+session_id cookies resolve to a Session through get_session (a dependency):
+- the sessions themselves live in a sqlite file (SESSIONS_DB), one connection per thread
+- in front of it, an LRU cache with a TTL, split in SHARDS shards. A session id
+  always goes to the same shard, each shard has its own lock and its own LRU
+  order, so threads looking up different sessions don't wait on each other
+  (there is no global lock, the stats are summed from the shards on demand)
+- a cached entry is trusted for CACHE_TTL seconds (or until the session
+  expires, if sooner), then re-read from the file
+- unknown ids are cached too (as "no session"), so a flood of made-up cookies
+  doesn't turn into a flood of file reads
+A hit never leaves the event loop, a miss reads the file in a thread.
+'''
+
+SESSIONS_DB = os.environ.get("SESSIONS_DB", "sessions.db") # sqlite file behind the session cache
+SESSION_LIFETIME = timedelta(days=1)
+CACHE_TTL = 60.0 # seconds
+CACHE_CAPACITY = 100_000 # sessions, split evenly between the shards
+SHARDS = 16 # power of 2
+
+
+class Session(BaseModel):
+    session_id: str
+    username: str
+    expires_at: datetime
+
+
+class SessionFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local() # sqlite connections can't be shared between threads
+
+    def open(self):
+        # creates the file: at startup, not when the module is imported
+        with self.connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL") # readers in other threads don't block on writes
+        return connection
+
+    def load(self, session_id: str) -> Session | None:
+        row = self.connection().execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return Session.model_validate_json(row[0]) if row else None
+
+    def save(self, session: Session):
+        with self.connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data) VALUES (?, ?)",
+                (session.session_id, session.model_dump_json()),
+            )
+
+
+class CacheShard:
+    __slots__ = ("lock", "entries", "hits", "misses", "evictions", "expirations")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, tuple[float, Session | None]] = OrderedDict() # id -> (valid until, session)
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+
+MISSING = object() # not in the cache (None is a cached "no such session")
+
+
+class ShardedSessionCache:
+    def __init__(self, capacity: int = CACHE_CAPACITY, shards: int = SHARDS, ttl: float = CACHE_TTL):
+        self.shards = [CacheShard() for _ in range(shards)]
+        self.mask = shards - 1
+        self.shard_capacity = max(1, capacity // shards)
+        self.ttl = ttl
+
+    def shard(self, session_id: str) -> CacheShard:
+        return self.shards[hash(session_id) & self.mask]
+
+    def get(self, session_id: str):
+        # the session, None for a known-unknown id, or MISSING
+        shard = self.shard(session_id)
+        with shard.lock:
+            entry = shard.entries.get(session_id)
+            if entry is None:
+                shard.misses += 1
+                return MISSING
+            if entry[0] < time.monotonic():
+                del shard.entries[session_id]
+                shard.expirations += 1
+                shard.misses += 1
+                return MISSING
+            shard.entries.move_to_end(session_id) # most recently used
+            shard.hits += 1
+            return entry[1]
+
+    def put(self, session_id: str, session: Session | None):
+        ttl = self.ttl
+        if session is not None: # never keep a session past its own expiry
+            ttl = min(ttl, (session.expires_at - datetime.now(timezone.utc)).total_seconds())
+        shard = self.shard(session_id)
+        with shard.lock:
+            shard.entries[session_id] = (time.monotonic() + ttl, session)
+            shard.entries.move_to_end(session_id)
+            while len(shard.entries) > self.shard_capacity:
+                shard.entries.popitem(last=False) # least recently used
+                shard.evictions += 1
+
+    def stats(self) -> dict:
+        totals = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "size": 0}
+        for shard in self.shards:
+            totals["hits"] += shard.hits
+            totals["misses"] += shard.misses
+            totals["evictions"] += shard.evictions
+            totals["expirations"] += shard.expirations
+            totals["size"] += len(shard.entries)
+        lookups = totals["hits"] + totals["misses"]
+        return {**totals, "hit_rate": round(totals["hits"] / lookups, 4) if lookups else 0.0, "shards": len(self.shards)}
+
+
+session_file = SessionFile(SESSIONS_DB)
+session_cache = ShardedSessionCache()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(session_file.open)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def load_session(session_id: str) -> Session | None:
+    # cache miss: read the file (blocking), cache the answer, found or not
+    session = session_file.load(session_id)
+    if session is not None and session.expires_at <= datetime.now(timezone.utc):
+        session = None
+    session_cache.put(session_id, session)
+    return session
+
+
+async def get_session(session_id: Annotated[str | None, Cookie()] = None) -> Session | None:
+    if session_id is None:
+        return None
+    session = session_cache.get(session_id)
+    if session is MISSING:
+        session = await asyncio.to_thread(load_session, session_id)
+    return session
+
+
+class NewSession(BaseModel):
+    username: str
+
+
+@app.post("/sessions/")
+async def create_session(new_session: NewSession, response: Response):
+    session = Session(
+        session_id=secrets.token_urlsafe(24),
+        username=new_session.username,
+        expires_at=datetime.now(timezone.utc) + SESSION_LIFETIME,
+    )
+    await asyncio.to_thread(session_file.save, session)
+    session_cache.put(session.session_id, session)
+    response.set_cookie("session_id", session.session_id, max_age=int(SESSION_LIFETIME.total_seconds()), httponly=True)
+    return session
+
+
+@app.get("/session-stats/")
+async def read_session_stats():
+    return session_cache.stats()
 
 
 class CookieModel(BaseModel):
@@ -20,8 +203,10 @@ async def read_cookie(
     cookies: Annotated[
         CookieModel,
         Cookie()
-    ]):
-    return cookies
+    ],
+    session: Annotated[Session | None, Depends(get_session)], # None: no such (or expired) session
+):
+    return {"cookies": cookies, "session": session}
 
 ## forbid exra cookies
 class CookieModel2(BaseModel):
@@ -38,5 +223,7 @@ async def read_cookie2(
     cookies: Annotated[
         CookieModel2,
         Cookie()
-    ]):
-    return cookies
\ No newline at end of file
+    ],
+    session: Annotated[Session | None, Depends(get_session)],
+):
+    return {"cookies": cookies, "session": session}
\ No newline at end of file
@@ -1,5 +1,419 @@
 # header parameter models
 
+## tracing from the traceparent header (W3C trace context)
+import dataclasses
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute, request_response
+
+'''
+a request with `traceparent: 00-<trace id>-<parent span id>-<flags>` continues
+that trace, any other request starts a new one. sampling is decided once, at
+the head: the caller's sampled flag wins, new traces are sampled at
+TRACE_SAMPLE_RATE. an unsampled request costs a header scan and a random().
+
+a sampled request only records timestamps (a Trace). when its response is
+done the Trace goes into a ring buffer, and a background thread turns it into
+spans appended to TRACE_FILE as JSON lines:
+
+    request            middleware entry -> response done (child of the caller's span)
+      routing          -> the route matched
+      validation       -> the handler is called (body, dependencies, params)
+      handler          -> the handler returned
+      serialization    -> response start
+
+FastAPI's own OpenTelemetry spans stay off: through the SDK a sampled
+request costs ~120us more, enough to move p99 at a 1% sample rate.
+'''
+
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.01")) # new traces only
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+TRACE_RING_SIZE = 1 << 14 # sampled requests kept between two exports, the oldest are dropped past it
+TRACE_EXPORT_INTERVAL = 1.0 # seconds
+
+HEX_DIGITS = b"0123456789abcdef"
+ODD_HEX_DIGITS = b"13579bdf"
+ZERO_TRACE_ID, ZERO_SPAN_ID = b"0" * 32, b"0" * 16
+
+
+def parse_traceparent(value: bytes) -> tuple[bytes, bytes, bool] | None:
+    # (trace id, parent span id, sampled), None when invalid: the request starts a new trace
+    # layout: version-trace id-parent id-flags, 2-32-16-2 lowercase hex digits
+    if len(value) < 55 or value[2] != 45 or value[35] != 45 or value[52] != 45: # 45: "-"
+        return None
+    if value[:55].translate(None, HEX_DIGITS) != b"---": # no checks per char in python
+        return None
+    version = value[:2]
+    if version == b"ff" or (len(value) > 55 and (version == b"00" or value[55] != 45)): # later versions may append fields
+        return None
+    trace_id, parent_id = value[3:35], value[36:52]
+    if trace_id == ZERO_TRACE_ID or parent_id == ZERO_SPAN_ID:
+        return None
+    return trace_id, parent_id, value[54] in ODD_HEX_DIGITS # flags bit 0: sampled
+
+
+class Trace:
+    __slots__ = ("trace_id", "parent_id", "method", "path", "route", "status",
+                 "started", "routed", "called", "returned", "responded", "finished")
+
+    def __init__(self, trace_id: str, parent_id: str | None, method: str, path: str):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.method = method
+        self.path = path
+        self.route = self.status = None
+        # time.time_ns() marks, None when the request never got there (404, 422, an exception...)
+        self.started = time.time_ns()
+        self.routed = self.called = self.returned = self.responded = self.finished = None
+
+
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+class TraceRing:
+    # one writer (the event loop), one reader (the exporter thread), no lock:
+    # every slot carries its sequence number, so the reader can tell a slot
+    # the writer already lapped from the one it expected
+    def __init__(self, size: int = TRACE_RING_SIZE):
+        assert size & (size - 1) == 0, "size must be a power of 2"
+        self.mask = size - 1
+        self.slots: list[tuple[int, Trace] | None] = [None] * size
+        self.written = 0 # only the writer moves it, after the slot is filled
+        self.read = 0 # only the reader moves it
+        self.dropped = 0
+
+    def push(self, trace: Trace):
+        seq = self.written
+        self.slots[seq & self.mask] = (seq, trace)
+        self.written = seq + 1
+
+    def drain(self) -> list[Trace]:
+        written = self.written # later pushes wait for the next drain
+        oldest = max(self.read, written - len(self.slots))
+        self.dropped += oldest - self.read
+        traces = []
+        for seq in range(oldest, written):
+            entry = self.slots[seq & self.mask]
+            if entry[0] == seq:
+                traces.append(entry[1])
+            else: # overwritten while draining
+                self.dropped += 1
+        self.read = written
+        return traces
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64) or 1:016x}"
+
+
+def trace_spans(trace: Trace) -> list[dict]:
+    root_id = new_span_id()
+    attributes = {"http.request.method": trace.method, "url.path": trace.path}
+    if trace.route is not None:
+        attributes["http.route"] = trace.route
+    if trace.status is not None:
+        attributes["http.response.status_code"] = trace.status
+    spans = [{
+        "trace_id": trace.trace_id, "span_id": root_id, "parent_span_id": trace.parent_id, "name": "request",
+        "start_time_unix_nano": trace.started, "end_time_unix_nano": trace.finished, "attributes": attributes,
+    }]
+    # a stage that didn't finish ends where the next thing that did happen starts
+    end = lambda *marks: next((mark for mark in marks if mark is not None), trace.finished)
+    stages = [("routing", trace.started, end(trace.routed, trace.responded))]
+    if trace.routed is not None:
+        stages.append(("validation", trace.routed, end(trace.called, trace.responded)))
+    if trace.called is not None:
+        stages.append(("handler", trace.called, end(trace.returned, trace.responded)))
+    if trace.returned is not None:
+        stages.append(("serialization", trace.returned, end(trace.responded)))
+    for name, start, stop in stages:
+        spans.append({
+            "trace_id": trace.trace_id, "span_id": new_span_id(), "parent_span_id": root_id, "name": name,
+            "start_time_unix_nano": start, "end_time_unix_nano": stop,
+        })
+    return spans
+
+
+class TraceExporter:
+    def __init__(self, ring: TraceRing, path: str, interval: float = TRACE_EXPORT_INTERVAL):
+        self.ring = ring
+        self.path = path
+        self.interval = interval
+        self.exported = 0
+        self.stopping = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="trace-exporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def run(self):
+        with open(self.path, "a") as file:
+            while not self.stopping.wait(self.interval):
+                self.export(file)
+            self.export(file) # what's left at shutdown
+
+    def export(self, file):
+        traces = self.ring.drain()
+        for trace in traces:
+            file.writelines(json.dumps(span) + "\n" for span in trace_spans(trace))
+        file.flush()
+        self.exported += len(traces)
+
+
+class TraceMiddleware:
+    def __init__(self, app, ring: TraceRing, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.app = app
+        self.ring = ring
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value)
+                break
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                return await self.app(scope, receive, send)
+            trace = Trace(f"{random.getrandbits(128) or 1:032x}", None, scope["method"], scope["path"])
+        elif parent[2]:
+            trace = Trace(parent[0].decode(), parent[1].decode(), scope["method"], scope["path"])
+        else: # the caller decided not to sample this trace
+            return await self.app(scope, receive, send)
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                trace.responded = time.time_ns()
+                trace.status = message["status"]
+            await send(message)
+
+        token = current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            trace.finished = time.time_ns()
+            current_trace.reset(token)
+            self.ring.push(trace)
+
+
+class TracedRoute(APIRoute):
+    # two handlers: the stock one, and one timing the endpoint that only sampled requests go through
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        self.traced_app = request_response(self.get_traced_handler())
+
+    async def handle(self, scope, receive, send):
+        trace = current_trace.get()
+        if trace is None or scope["method"] not in self.methods: # a 405 stays with the stock handler
+            return await super().handle(scope, receive, send)
+        trace.routed = time.time_ns()
+        trace.route = self.path
+        await self.traced_app(scope, receive, send)
+
+    def get_traced_handler(self):
+        endpoint = self.dependant.call
+        if inspect.isasyncgenfunction(endpoint) or inspect.isgeneratorfunction(endpoint):
+            return self.get_route_handler() # streamed, there's no single "returned"
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed(**kwargs):
+                trace = current_trace.get()
+                trace.called = time.time_ns()
+                result = await endpoint(**kwargs)
+                trace.returned = time.time_ns()
+                return result
+        else:
+            @functools.wraps(endpoint)
+            def timed(**kwargs): # runs in the threadpool, the context (and the trace) comes along
+                trace = current_trace.get()
+                trace.called = time.time_ns()
+                result = endpoint(**kwargs)
+                trace.returned = time.time_ns()
+                return result
+
+        documented = self.dependant
+        self.dependant = dataclasses.replace(documented, call=timed)
+        try:
+            return self.get_route_handler()
+        finally:
+            self.dependant = documented
+
+
+trace_ring = TraceRing()
+trace_exporter = TraceExporter(trace_ring, TRACE_FILE)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    trace_exporter.start()
+    yield
+    trace_exporter.stop()
+
+
+## Save-Data / Accept-Encoding: compact, compressed and cached JSON bodies
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import MutableHeaders
+
+'''
+`Save-Data: on` gets compact JSON: nulls dropped (in objects, list items keep
+their place), no whitespace. an Accept-Encoding allowing gzip or deflate gets
+the body compressed, for bodies of COMPRESS_MIN_BYTES and more.
+
+the bytes to send are cached by (body digest, compact, encoding): a hot
+response is hashed and looked up, not re-parsed and re-compressed on every
+request. only complete (not streamed) 200 JSON responses without a
+Content-Encoding are touched.
+'''
+
+COMPRESS_MIN_BYTES = 500 # below this, headers + gzip framing eat the savings (Starlette's GZipMiddleware default)
+COMPRESS_LEVEL = 6
+BODY_CACHE_BYTES = 64 * 2**20
+
+
+@functools.lru_cache(maxsize=256) # clients send a handful of distinct Accept-Encoding values
+def pick_encoding(accept_encoding: bytes) -> str | None:
+    # gzip or deflate, whichever has the higher q-value (gzip on a tie), None for neither
+    weights = {}
+    for part in accept_encoding.decode("latin-1").lower().split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    best = max(("gzip", "deflate"), key=lambda encoding: weights.get(encoding, wildcard)) # max keeps gzip on a tie
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+def drop_nulls(value):
+    if isinstance(value, dict):
+        return {key: drop_nulls(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [drop_nulls(item) for item in value]
+    return value
+
+
+def compact_json(body: bytes) -> bytes:
+    try:
+        value = json.loads(body)
+    except ValueError:
+        return body
+    return json.dumps(drop_nulls(value), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode_body(body: bytes, compact: bool, encoding: str | None) -> tuple[bytes, str | None]:
+    # (bytes to send, the Content-Encoding applied)
+    if compact:
+        body = compact_json(body)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "gzip":
+        compressed = gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+    else: # HTTP's "deflate" is the zlib format
+        compressed = zlib.compress(body, COMPRESS_LEVEL)
+    return (compressed, encoding) if len(compressed) < len(body) else (body, None)
+
+
+class EncodedBodyCache:
+    # LRU bounded by the bytes it holds, only used from the event loop
+    def __init__(self, max_bytes: int = BODY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple[bytes, bool, str | None], tuple[bytes, str | None]] = OrderedDict()
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, body: bytes, compact: bool, encoding: str | None) -> tuple[bytes, str | None]:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), compact, encoding)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        entry = encode_body(body, compact, encoding)
+        self.entries[key] = entry
+        self.size += len(entry[0])
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.stats["evictions"] += 1
+        return entry
+
+
+class SaveDataMiddleware:
+    def __init__(self, app, cache: EncodedBodyCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        save_data, encoding = False, None
+        for name, value in scope["headers"]:
+            if name == b"save-data":
+                save_data = value.strip().lower() == b"on"
+            elif name == b"accept-encoding":
+                encoding = pick_encoding(value)
+        if not save_data and encoding is None:
+            return await self.app(scope, receive, send)
+        held = None
+
+        async def send_encoded(message):
+            nonlocal held
+            if message["type"] == "http.response.start":
+                held = message # until the body shows whether it can be encoded
+                return
+            if held is None:
+                return await send(message)
+            start, held = held, None
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                message["type"] == "http.response.body" and not message.get("more_body", False)
+                and start["status"] == 200 and headers.get("content-type", "").startswith("application/json")
+                and "content-encoding" not in headers
+            ):
+                body, applied = self.cache.get(message["body"], save_data, encoding)
+                headers["content-length"] = str(len(body))
+                if applied is not None:
+                    headers["content-encoding"] = applied
+                headers.add_vary_header("Accept-Encoding")
+                headers.add_vary_header("Save-Data")
+                message = {**message, "body": body}
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_encoded)
+
+
+body_cache = EncodedBodyCache()
+
+
 ## header parameters wih a pydantic model
 
 from typing import Annotated
@@ -7,7 +421,10 @@ from typing import Annotated
 from fastapi import FastAPI, Header
 from pydantic import BaseModel
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = TracedRoute
+app.add_middleware(SaveDataMiddleware, cache=body_cache)
+app.add_middleware(TraceMiddleware, ring=trace_ring) # outermost: the request span includes the encoding
 
 
 class MainHeaders(BaseModel):
@@ -38,4 +455,19 @@ class MainHeaders2(BaseModel):
     
 @app.get("/items2/")
 async def read_items2(headers: Annotated[MainHeaders2, Header()]):
-    return headers
\ No newline at end of file
+    return headers
+
+
+@app.get("/trace-stats/")
+async def read_trace_stats():
+    return {
+        "sample_rate": TRACE_SAMPLE_RATE,
+        "pushed": trace_ring.written,
+        "exported": trace_exporter.exported,
+        "dropped": trace_ring.dropped,
+    }
+
+
+@app.get("/body-cache-stats/")
+async def read_body_cache_stats():
+    return {**body_cache.stats, "entries": len(body_cache.entries), "bytes": body_cache.size}
@@ -6,6 +6,245 @@ from pydantic import BaseModel, EmailStr
 app = FastAPI()
 
 
+## serializer fast path: returning exactly the response model
+import dataclasses
+import functools
+import inspect
+from typing import get_args, get_origin
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute, request_response
+from pydantic import TypeAdapter
+
+'''
+a handler returning its response model (Item, list[Item]) still has the value
+validated against that model before it is serialized. endpoints marked with
+@trusted_return skip that when the value is exactly the declared type: an
+instance of the model itself (for a list: every element), which was validated
+when it was built. it goes straight to the model's serializer (one TypeAdapter
+per response model, cached), with the route's include/exclude/by_alias/
+exclude_* options.
+
+anything else (a dict, a subclass like UserIn for a UserOut model, a model
+built with model_construct() inside a list of other types...) takes the safe
+path: validated and filtered as usual. routes that take a `response: Response`
+parameter or set a response_class keep the safe path too, the fast path would
+drop what they set.
+'''
+
+
+@functools.cache
+def model_serializer(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def trusted_return(endpoint):
+    # opt in: an instance of exactly the response model is serialized without revalidation
+    endpoint.trusted_return = True
+    return endpoint
+
+
+def exact_type_check(annotation):
+    # value -> is it exactly `annotation`, None for response models the fast path doesn't cover
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return lambda value: type(value) is annotation
+    if get_origin(annotation) is list:
+        (model,) = get_args(annotation)
+        if isinstance(model, type) and issubclass(model, BaseModel):
+            # one C loop, no per-item python
+            return lambda value: type(value) is list and list(map(type, value)).count(model) == len(value)
+    return None
+
+
+def serializer_options(route: APIRoute) -> dict:
+    return {
+        "include": route.response_model_include,
+        "exclude": route.response_model_exclude,
+        "by_alias": route.response_model_by_alias,
+        "exclude_unset": route.response_model_exclude_unset,
+        "exclude_defaults": route.response_model_exclude_defaults,
+        "exclude_none": route.response_model_exclude_none,
+    }
+
+
+class FastReturnRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        endpoint = self.dependant.call
+        if (
+            not isinstance(self.response_class, DefaultPlaceholder)
+            or self.dependant.response_param_name is not None
+            or inspect.isasyncgenfunction(endpoint) or inspect.isgeneratorfunction(endpoint)
+        ):
+            return # the Response these return would drop what they set
+        convert = self.result_converter()
+        if convert is not None:
+            self.app = request_response(self.get_converting_handler(convert))
+
+    def result_converter(self):
+        # value returned by the endpoint -> what FastAPI gets (a Response is sent as is:
+        # no validation, no second serialization), None to leave the endpoint alone
+        is_exact = exact_type_check(self.response_model)
+        if is_exact is None or not getattr(self.endpoint, "trusted_return", False):
+            return None
+        serializer = model_serializer(self.response_model)
+        options = serializer_options(self)
+        status_code = self.status_code or 200
+
+        def serialized(value):
+            if not is_exact(value):
+                return value # the safe path
+            return Response(serializer.dump_json(value, **options), status_code, media_type="application/json")
+        return serialized
+
+    def get_converting_handler(self, convert):
+        endpoint = self.dependant.call
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def call(**kwargs):
+                return convert(await endpoint(**kwargs))
+        else:
+            @functools.wraps(endpoint)
+            def call(**kwargs): # runs in the threadpool, and converts there
+                return convert(endpoint(**kwargs))
+
+        documented = self.dependant
+        self.dependant = dataclasses.replace(documented, call=call)
+        try:
+            return self.get_route_handler()
+        finally:
+            self.dependant = documented
+
+
+## streaming list[...] responses from an async iterator
+from collections.abc import AsyncIterator
+
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+'''
+a handler of a list[Model] route can return an async iterator of models (or
+dicts) instead of the list. the response is then streamed, never built whole:
+- `Accept: application/x-ndjson` (or application/jsonl): one element per line
+- anything else: a JSON array, sent in chunks
+every element is still validated against Model (unless the endpoint is
+marked @trusted_return and the element is exactly a Model) and serialized with
+the route's options, one at a time. the first one is sent as soon as it is ready, the
+rest in chunks of about STREAM_CHUNK_BYTES, so memory stays flat however many
+rows there are.
+
+an invalid first element fails the request with a 500 as usual. past it the
+status line is already sent: the stream is cut short, and the client gets an
+incomplete array (or a missing last line).
+'''
+
+STREAM_CHUNK_BYTES = 64 * 1024
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl")
+END = object() # the iterator is exhausted (None can be an element)
+
+
+def wants_ndjson(accept: bytes) -> bool:
+    # NDJSON when it is accepted with a q-value at least as high as JSON's
+    weights = {}
+    for part in accept.decode("latin-1").lower().split(","):
+        media_type, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[media_type.strip()] = q
+    ndjson = max(weights.get(media_type, 0.0) for media_type in NDJSON_TYPES)
+    return ndjson > 0 and ndjson >= weights.get("application/json", 0.0)
+
+
+class ListStreamResponse(StreamingResponse):
+    def __init__(
+        self,
+        elements: AsyncIterator,
+        adapter: TypeAdapter,
+        options: dict,
+        status_code: int = 200,
+        trusted_type: type | None = None, # elements of exactly this type aren't revalidated
+    ):
+        super().__init__(iter(()), status_code) # the body iterator is built once the format is known
+        self.elements = elements
+        self.adapter = adapter
+        self.options = options
+        self.trusted_type = trusted_type
+
+    def encode(self, element) -> bytes:
+        if type(element) is not self.trusted_type:
+            try:
+                element = self.adapter.validate_python(element, from_attributes=True)
+            except ValidationError as exc:
+                raise ResponseValidationError(exc.errors(include_url=False), body=element) from None
+        return self.adapter.dump_json(element, **self.options)
+
+    async def __call__(self, scope, receive, send):
+        accept = next((value for name, value in scope["headers"] if name == b"accept"), b"")
+        self.headers.add_vary_header("Accept") # caches must not hand an NDJSON body to a JSON client
+        if wants_ndjson(accept):
+            self.headers["content-type"] = "application/x-ndjson"
+            separator, opening, closing, empty = b"\n", b"", b"\n", b""
+        else:
+            self.headers["content-type"] = "application/json"
+            separator, opening, closing, empty = b",", b"[", b"]", b"[]"
+        try:
+            # validated before the status line, a bad first element is still a clean 500
+            first = await anext(self.elements, END)
+            if first is END:
+                self.body_iterator = self.chunks(empty, separator, b"") # nothing left to iterate
+            else:
+                self.body_iterator = self.chunks(opening + self.encode(first), separator, closing)
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.elements, "aclose", None)
+            if aclose is not None: # the handler's generator gets its finally blocks run, even on a disconnect
+                await aclose()
+
+    async def chunks(self, head: bytes, separator: bytes, closing: bytes) -> AsyncIterator[bytes]:
+        yield head # time to first byte: one element
+        buffer = []
+        size = 0
+        async for element in self.elements:
+            data = self.encode(element)
+            buffer.append(data)
+            size += len(data) + 1
+            if size >= STREAM_CHUNK_BYTES:
+                yield separator + separator.join(buffer)
+                buffer.clear()
+                size = 0
+        yield (separator + separator.join(buffer) if buffer else b"") + closing
+
+
+class StreamingListRoute(FastReturnRoute):
+    def result_converter(self):
+        convert = super().result_converter()
+        if get_origin(self.response_model) is not list:
+            return convert
+        (element_type,) = get_args(self.response_model)
+        adapter = model_serializer(element_type)
+        options = serializer_options(self)
+        status_code = self.status_code or 200
+        trusted_type = element_type if getattr(self.endpoint, "trusted_return", False) else None
+
+        def streamed(value):
+            if isinstance(value, AsyncIterator):
+                return ListStreamResponse(value, adapter, options, status_code, trusted_type)
+            return value if convert is None else convert(value)
+        return streamed
+
+
+# list[...] routes may return an async iterator, endpoints marked @trusted_return skip revalidation
+app.router.route_class = StreamingListRoute
+
+
 class Item(BaseModel):
     name: str
     description: str | None = None
@@ -15,33 +254,41 @@ class Item(BaseModel):
     
     
 @app.post("/items/")
+@trusted_return
 async def create_item(item: Item) -> Item:
     return item
 
-@app.get("/items/")
-async def read_items() -> list[Item]:
-    return [
-        Item(
-            name="Foo",
-            description="The Foo item",
-            price=50.2,
-            tax=10.5,
-            tags=["foo", "item"]
-        ),
-        Item(
-            name="Bar",
-            description="The Bar item",
-            price=62,
-            tax=20.2,
-            tags=["bar", "item"]
-        )
-    ]
+item_rows = [
+    Item(
+        name="Foo",
+        description="The Foo item",
+        price=50.2,
+        tax=10.5,
+        tags=["foo", "item"]
+    ),
+    Item(
+        name="Bar",
+        description="The Bar item",
+        price=62,
+        tax=20.2,
+        tags=["bar", "item"]
+    )
+]
+
+@app.get("/items/", response_model=list[Item])
+@trusted_return
+async def read_items() -> AsyncIterator[Item]:
+    async def rows():
+        for item in item_rows: # a database cursor in real life, streamed as it is read
+            yield item
+    return rows()
     
     
 ## response_model parameter
 from typing import Any
 
 @app.post("/items2/", response_model=Item)
+@trusted_return
 async def create_item2(item: Item) -> Any:
     return item
 
@@ -134,6 +381,121 @@ async def get_portal_no_response_model(teleport: bool = False) -> Response | dic
     return {"message": "Welcome to the portal!"}
 
 
+## conditional GET: ETag / If-Modified-Since
+
+'''
+polling clients mostly re-read items that haven't changed. every item carries
+a version and a last-modified time (VersionTable), and routes marked with
+@conditional(...) answer a matching If-None-Match / If-Modified-Since with
+304 before the handler runs: nothing is looked up, validated or serialized.
+other responses get ETag and Last-Modified for the next poll.
+
+If-None-Match wins over If-Modified-Since when both are sent (RFC 9110), an
+unparsable date is ignored, only GET (and HEAD) are conditional.
+'''
+
+import secrets
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from itertools import count
+
+from fastapi.routing import APIRoute
+
+
+class ResourceVersion:
+    __slots__ = ("etag", "last_modified", "http_date", "headers")
+
+    def __init__(self, etag: str, last_modified: datetime):
+        self.etag = etag
+        self.last_modified = last_modified.replace(microsecond=0) # HTTP dates stop at seconds
+        self.http_date = format_datetime(self.last_modified, usegmt=True)
+        # built once per version, every 200 and 304 sends them
+        self.headers = [(b"etag", etag.encode()), (b"last-modified", self.http_date.encode())]
+
+    def not_modified(self, if_none_match: str | None, if_modified_since: str | None) -> bool:
+        if if_none_match is not None:
+            if if_none_match == self.etag: # what a poller echoes back, no parsing
+                return True
+            tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+            return any(tag == self.etag or tag == "*" for tag in tags)
+        if if_modified_since is not None:
+            if if_modified_since == self.http_date:
+                return True
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+        return False
+
+
+class VersionTable:
+    def __init__(self):
+        # the prefix changes on every start, so an ETag from a previous process never matches
+        self.prefix = secrets.token_hex(4)
+        self.counter = count(1)
+        self.versions: dict[str, ResourceVersion] = {}
+
+    def touch(self, key: str) -> ResourceVersion:
+        # call on every write to the resource
+        last_modified = datetime.now(timezone.utc)
+        previous = self.versions.get(key)
+        if previous is not None:
+            # HTTP dates stop at seconds: a second write within the same second must still move
+            # Last-Modified, or If-Modified-Since pollers get 304 for the stale copy
+            last_modified = max(last_modified, previous.last_modified + timedelta(seconds=1))
+        version = ResourceVersion(f'"{self.prefix}-{next(self.counter)}"', last_modified)
+        self.versions[key] = version
+        return version
+
+    def get(self, key: str | None) -> ResourceVersion | None:
+        return self.versions.get(key)
+
+
+def conditional(versions: VersionTable, key: str):
+    # key: the path param naming the resource in `versions`
+    def mark(endpoint):
+        endpoint.conditional = (versions, key)
+        return endpoint
+    return mark
+
+
+class ConditionalRoute(StreamingListRoute):
+    async def handle(self, scope, receive, send):
+        marked = getattr(self.endpoint, "conditional", None)
+        if marked is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().handle(scope, receive, send)
+        versions, key = marked
+        version = versions.get(scope["path_params"].get(key))
+        if version is None: # unknown resource, the handler answers (404...)
+            return await super().handle(scope, receive, send)
+
+        if_none_match = if_modified_since = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                value = value.decode("latin-1")
+                if_none_match = value if if_none_match is None else f"{if_none_match}, {value}"
+            elif name == b"if-modified-since":
+                if_modified_since = value.decode("latin-1")
+        if version.not_modified(if_none_match, if_modified_since):
+            # straight to the wire, not even a Response object
+            await send({"type": "http.response.start", "status": 304, "headers": version.headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message["headers"] = [*message["headers"], *version.headers]
+            await send(message)
+
+        await super().handle(scope, receive, send_with_validators)
+
+
+app.router.route_class = ConditionalRoute # only changes endpoints marked with @conditional (or @trusted_return)
+
+
 ## response model encoding parameters
 
 class Item2(BaseModel):
@@ -149,10 +511,21 @@ items = {
     "baz": {"name": "Baz", "description": None, "price": 50.2, "tax": 10.5, "tags": []},
 }
 
+item_versions = VersionTable()
+for item_id in items:
+    item_versions.touch(item_id)
+
 @app.get("/items3/{item_id}", response_model=Item2, response_model_exclude_unset=True)
+@conditional(item_versions, "item_id")
 async def read_item(item_id: str):
     return items[item_id]
 
+@app.put("/items3/{item_id}", response_model=Item2, response_model_exclude_unset=True)
+async def replace_item(item_id: str, item: Item2):
+    items[item_id] = item.model_dump(exclude_unset=True)
+    item_versions.touch(item_id) # the next poll gets the new body
+    return items[item_id]
+
 ## response_model_include and response_model_exclude
 
 class Item4(BaseModel):
@@ -179,10 +552,12 @@ items = {
     response_model=Item4,
     response_model_include={"name", "description"},
 )
+@conditional(item_versions, "item_id")
 async def read_item_name(item_id: str):
     return items[item_id]
 
 
 @app.get("/items4/{item_id}/public", response_model=Item4, response_model_exclude={"tax"})
+@conditional(item_versions, "item_id")
 async def read_item_public_data(item_id: str):
     return items[item_id]
\ No newline at end of file
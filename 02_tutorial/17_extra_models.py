@@ -102,6 +102,164 @@ async def read_item(item_id: str):
     return items[item_id]
 
 
+## streaming list[...] responses from an async iterator
+import dataclasses
+import functools
+import inspect
+from collections.abc import AsyncIterator
+from typing import get_args, get_origin
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute, request_response
+from pydantic import TypeAdapter, ValidationError
+
+'''
+as in 16_response_model: a list[Model] route whose handler returns an async
+iterator streams it, as NDJSON when the Accept header asks for
+application/x-ndjson (or application/jsonl), as a chunked JSON array
+otherwise. each element is validated against Model on its way out.
+
+the code from STREAM_CHUNK_BYTES down to ListStreamResponse is the same as in
+16_response_model, change both together. only the route differs: this one
+has no @trusted_return fast path.
+'''
+
+STREAM_CHUNK_BYTES = 64 * 1024
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl")
+END = object() # the iterator is exhausted (None can be an element)
+
+
+def wants_ndjson(accept: bytes) -> bool:
+    # NDJSON when it is accepted with a q-value at least as high as JSON's
+    weights = {}
+    for part in accept.decode("latin-1").lower().split(","):
+        media_type, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[media_type.strip()] = q
+    ndjson = max(weights.get(media_type, 0.0) for media_type in NDJSON_TYPES)
+    return ndjson > 0 and ndjson >= weights.get("application/json", 0.0)
+
+
+class ListStreamResponse(StreamingResponse):
+    def __init__(
+        self,
+        elements: AsyncIterator,
+        adapter: TypeAdapter,
+        options: dict,
+        status_code: int = 200,
+        trusted_type: type | None = None, # elements of exactly this type aren't revalidated
+    ):
+        super().__init__(iter(()), status_code) # the body iterator is built once the format is known
+        self.elements = elements
+        self.adapter = adapter
+        self.options = options
+        self.trusted_type = trusted_type
+
+    def encode(self, element) -> bytes:
+        if type(element) is not self.trusted_type:
+            try:
+                element = self.adapter.validate_python(element, from_attributes=True)
+            except ValidationError as exc:
+                raise ResponseValidationError(exc.errors(include_url=False), body=element) from None
+        return self.adapter.dump_json(element, **self.options)
+
+    async def __call__(self, scope, receive, send):
+        accept = next((value for name, value in scope["headers"] if name == b"accept"), b"")
+        self.headers.add_vary_header("Accept") # caches must not hand an NDJSON body to a JSON client
+        if wants_ndjson(accept):
+            self.headers["content-type"] = "application/x-ndjson"
+            separator, opening, closing, empty = b"\n", b"", b"\n", b""
+        else:
+            self.headers["content-type"] = "application/json"
+            separator, opening, closing, empty = b",", b"[", b"]", b"[]"
+        try:
+            # validated before the status line, a bad first element is still a clean 500
+            first = await anext(self.elements, END)
+            if first is END:
+                self.body_iterator = self.chunks(empty, separator, b"") # nothing left to iterate
+            else:
+                self.body_iterator = self.chunks(opening + self.encode(first), separator, closing)
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.elements, "aclose", None)
+            if aclose is not None: # the handler's generator gets its finally blocks run, even on a disconnect
+                await aclose()
+
+    async def chunks(self, head: bytes, separator: bytes, closing: bytes) -> AsyncIterator[bytes]:
+        yield head # time to first byte: one element
+        buffer = []
+        size = 0
+        async for element in self.elements:
+            data = self.encode(element)
+            buffer.append(data)
+            size += len(data) + 1
+            if size >= STREAM_CHUNK_BYTES:
+                yield separator + separator.join(buffer)
+                buffer.clear()
+                size = 0
+        yield (separator + separator.join(buffer) if buffer else b"") + closing
+
+
+class StreamingListRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        if (
+            get_origin(self.response_model) is not list
+            or not isinstance(self.response_class, DefaultPlaceholder)
+            or self.dependant.response_param_name is not None
+            or inspect.isasyncgenfunction(endpoint) or inspect.isgeneratorfunction(endpoint)
+        ):
+            return
+        self.app = request_response(self.get_streaming_handler())
+
+    def get_streaming_handler(self):
+        endpoint = self.dependant.call
+        (element_type,) = get_args(self.response_model)
+        adapter = TypeAdapter(element_type)
+        options = {
+            "include": self.response_model_include,
+            "exclude": self.response_model_exclude,
+            "by_alias": self.response_model_by_alias,
+            "exclude_unset": self.response_model_exclude_unset,
+            "exclude_defaults": self.response_model_exclude_defaults,
+            "exclude_none": self.response_model_exclude_none,
+        }
+        status_code = self.status_code or 200
+
+        def streamed(value):
+            if isinstance(value, AsyncIterator):
+                return ListStreamResponse(value, adapter, options, status_code)
+            return value # a list: validated and serialized by FastAPI
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def call(**kwargs):
+                return streamed(await endpoint(**kwargs))
+        else:
+            @functools.wraps(endpoint)
+            def call(**kwargs):
+                return streamed(endpoint(**kwargs))
+
+        documented = self.dependant
+        self.dependant = dataclasses.replace(documented, call=call)
+        try:
+            return self.get_route_handler()
+        finally:
+            self.dependant = documented
+
+
+app.router.route_class = StreamingListRoute # only changes list[...] routes
+
+
 ## list of models
 class Item(BaseModel):
     name: str
@@ -114,8 +272,11 @@ items_list = [
 ]
 
 @app.get("/items/", response_model=list[Item])
-async def read_items():
-    return items_list
+async def read_items() -> AsyncIterator[dict]:
+    async def rows():
+        for item in items_list: # rows as they come from the database, never all in memory
+            yield item
+    return rows()
 
 
 # response with arbitrary dict
@@ -0,0 +1,61 @@
+# micro-batched vs one-request-at-a-time inference for 02_predefined
+
+'''
+Drives POST /models/{model_name}/predict in-process with many requests in
+flight, once with batching disabled (max_batch_size=1) and once with the
+default micro-batcher, and prints throughput, latency and the batch metrics.
+
+usage (from the repo root):
+    python 03_benchmarks/02_predefined_batching.py --model alexnet --concurrency 64
+'''
+
+import argparse
+import asyncio
+
+import numpy as np
+
+from asgi_bench import TUTORIAL_DIR, Lifespan, bench_route, encode_request, load_module
+
+
+async def run(module, model_name: str, max_batch_size: int, args) -> tuple[dict, dict]:
+    name = module.ModelName(model_name)
+    batcher = module.MicroBatcher(module.models[name], max_batch_size=max_batch_size, max_wait_ms=args.max_wait_ms)
+    module.batchers[name] = batcher
+    features = np.random.default_rng(0).standard_normal(module.INPUT_SIZE).round(4).tolist()
+    scope, body = encode_request({
+        "route": "/models/{model_name}/predict",
+        "method": "POST",
+        "path": {"model_name": model_name},
+        "query": {},
+        "headers": {},
+        "cookies": {},
+        "json": {"features": features},
+    })
+    async with Lifespan(module.app) as lifespan:
+        result = await bench_route(
+            module.app, lifespan.state, scope, body, args.requests, args.warmup, args.concurrency
+        )
+    return result, batcher.metrics.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="alexnet", choices=["alexnet", "resnet", "lenet"])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "02_predefined.py")
+    for label, size in (("unbatched", 1), ("batched", args.max_batch_size)):
+        result, metrics = asyncio.run(run(module, args.model, size, args))
+        print(
+            f"{label:<10} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms"
+            f"  mean batch {metrics['mean_batch_size']}  queue wait p99 {metrics['queue_wait_ms']['p99']}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# offset vs cursor pagination over the 03_query_params item store
+
+'''
+1. pages through the whole store (10M items by default) with skip/limit and
+   with cursors, and reports per-page latency percentiles for each style
+2. requests a shallow, a middle and the deepest page through the ASGI app
+3. pages through a smaller store while earlier items are being deleted and
+   counts how many items each style never returned
+
+usage (from the repo root):
+    python 03_benchmarks/03_query_params_pagination.py --items 10000000 --limit 100
+'''
+
+import argparse
+import asyncio
+import time
+
+from asgi_bench import TUTORIAL_DIR, bench_route, encode_request, load_module, percentile
+
+
+def build_store(module, size: int):
+    store = module.ItemStore()
+    for i in range(size):
+        store.add(f"item-{i}")
+    return store
+
+
+def scan(store, limit: int, style: str) -> tuple[int, list[int]]:
+    timings = []
+    returned = 0
+    skip, last_id = 0, None
+    while True:
+        start = time.perf_counter_ns()
+        if style == "offset":
+            page, next_id = store.page_offset(skip, limit)
+        else:
+            page, next_id = store.page_after(last_id, limit)
+        timings.append(time.perf_counter_ns() - start)
+        returned += len(page)
+        skip += limit
+        last_id = next_id
+        if next_id is None:
+            return returned, sorted(timings)
+
+
+def scan_while_deleting(module, size: int, limit: int, style: str) -> int:
+    # before every page, delete the oldest item the client has already seen
+    store = build_store(module, size)
+    seen = set()
+    skip, last_id = 0, None
+    while True:
+        if style == "offset":
+            page, next_id = store.page_offset(skip, limit)
+        else:
+            page, next_id = store.page_after(last_id, limit)
+        seen.update(item["item_name"] for item in page)
+        if next_id is None:
+            break
+        skip += limit
+        last_id = next_id
+        store.delete(store.ids[0])
+    return size - len(seen) # items that existed the whole time but were never returned
+
+
+async def depth_latency(module, limit: int, requests: int) -> None:
+    store = module.items_store
+    depths = {"first": 0, "middle": len(store) // 2, "last": len(store) - limit}
+    for name, position in depths.items():
+        cursor = module.encode_cursor(store.ids[position - 1]) if position else None
+        for style, query in (
+            ("offset", {"skip": position, "limit": limit}),
+            ("cursor", {"limit": limit, **({"cursor": cursor} if cursor else {})}),
+        ):
+            scope, body = encode_request({
+                "route": "/items/", "method": "GET", "path": {}, "query": query, "headers": {}, "cookies": {},
+            })
+            result = await bench_route(module.app, {}, scope, body, requests, 20, 1)
+            print(f"  {name:<7} page  {style:<7} p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500, help="ASGI requests per depth/style")
+    parser.add_argument("--stability-items", type=int, default=20_000)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "03_query_params.py")
+    started = time.perf_counter()
+    module.items_store = build_store(module, args.items)
+    print(f"built store with {args.items:,} items in {time.perf_counter() - started:.1f}s")
+
+    print(f"full scan, limit={args.limit}")
+    for style in ("offset", "cursor"):
+        started = time.perf_counter()
+        returned, timings = scan(module.items_store, args.limit, style)
+        print(
+            f"  {style:<7} {returned:,} items in {len(timings):,} pages, {time.perf_counter() - started:.2f}s"
+            f"  page p50 {percentile(timings, 0.5) * 1000:.1f}us  p99 {percentile(timings, 0.99) * 1000:.1f}us"
+            f"  p999 {percentile(timings, 0.999) * 1000:.1f}us"
+        )
+
+    print("ASGI latency by page depth")
+    asyncio.run(depth_latency(module, args.limit, args.requests))
+
+    print(f"paging {args.stability_items:,} items while deleting already-seen ones")
+    for style in ("offset", "cursor"):
+        missed = scan_while_deleting(module, args.stability_items, args.limit, style)
+        print(f"  {style:<7} missed {missed} items")
+
+
+if __name__ == "__main__":
+    main()
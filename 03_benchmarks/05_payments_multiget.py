@@ -0,0 +1,78 @@
+# one request for N payment ids vs N requests for one id, 05_query_params_str_validations
+
+'''
+The payment backend gets a simulated per-lookup latency (a remote service).
+For every round, fetch N ids:
+- 1xN: one GET /payments/?q=..&q=.. with all N ids
+- Nx1 sequential: N requests with one id each, one after the other
+- Nx1 parallel: N requests with one id each, --client-parallelism at a time
+
+usage (from the repo root):
+    python 03_benchmarks/05_payments_multiget.py --ids 50 --latency-ms 2
+'''
+
+import argparse
+import asyncio
+import time
+
+from asgi_bench import TUTORIAL_DIR, call, encode_request, load_module, percentile
+
+
+def payments_scope(ids: list[str]):
+    return encode_request({
+        "route": "/payments/", "method": "GET", "path": {}, "query": {"q": ids}, "headers": {}, "cookies": {},
+    })
+
+
+async def run(module, args) -> None:
+    ids = [f"Pay{i}" for i in range(args.ids)]
+    module.payment_backend = module.InMemoryPaymentBackend(
+        {payment_id: {"amount": 1.0, "currency": "EUR", "status": "settled"} for payment_id in ids},
+        latency=args.latency_ms / 1000,
+    )
+    app = module.app
+    single = [payments_scope([payment_id]) for payment_id in ids]
+    batched = payments_scope(ids)
+    semaphore = asyncio.Semaphore(args.client_parallelism)
+
+    async def one_by_one_parallel():
+        async def limited(scope, body):
+            async with semaphore:
+                await call(app, scope, body, {})
+        await asyncio.gather(*(limited(scope, body) for scope, body in single))
+
+    async def one_by_one_sequential():
+        for scope, body in single:
+            await call(app, scope, body, {})
+
+    styles = {
+        "1xN": lambda: call(app, *batched, {}),
+        "Nx1 sequential": one_by_one_sequential,
+        f"Nx1 parallel({args.client_parallelism})": one_by_one_parallel,
+    }
+    for label, round_trip in styles.items():
+        await round_trip() # warmup
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter_ns()
+            await round_trip()
+            timings.append(time.perf_counter_ns() - start)
+        timings.sort()
+        print(
+            f"{label:<20} {args.ids} ids per round: p50 {percentile(timings, 0.5):.2f}ms"
+            f"  p99 {percentile(timings, 0.99):.2f}ms  ({args.ids * args.rounds / (sum(timings) / 1e9):,.0f} ids/s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--client-parallelism", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(load_module(TUTORIAL_DIR / "05_query_params_str_validations.py"), args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# dense numpy order table vs dict-of-dicts, 06_path_params_num_validations
+
+'''
+Builds the same random orders in an OrderTable and in a plain
+{order_id: {"price": .., "quantity": .., "status": ..}} dict and compares
+memory (tracemalloc, numpy reports its buffers to it), id lookup latency and
+price range query latency.
+
+A dict of 10M dicts needs several GB, so the dict store is built with
+--dict-orders (default 2M) and its memory is also shown scaled to --orders.
+
+usage (from the repo root):
+    python 03_benchmarks/06_orders_table.py --orders 10000000
+'''
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from asgi_bench import TUTORIAL_DIR, load_module, percentile
+
+
+def measure(label: str, count: int, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = build()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<6} {count:>12,} orders  built in {elapsed:6.2f}s  {size / 2**20:9.1f} MiB  {size / count:6.1f} B/order")
+    return store, size
+
+
+def timed(fn, repeat: int) -> list[int]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append(time.perf_counter_ns() - start)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=10_000_000)
+    parser.add_argument("--dict-orders", type=int, default=2_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--range-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "06_path_params_num_validations.py")
+    rng = np.random.default_rng(0)
+    prices = rng.uniform(0.5, 10.4, args.orders).round(2)
+    quantities = rng.integers(1, 20, args.orders)
+    statuses = rng.integers(0, len(module.ORDER_STATUSES), args.orders)
+
+    def build_table():
+        table = module.OrderTable(args.orders)
+        table.rows["exists"] = True
+        table.rows["price"] = prices
+        table.rows["quantity"] = quantities
+        table.rows["status"] = statuses
+        return table
+
+    def build_dict():
+        return {
+            i: {"price": p, "quantity": q, "status": module.ORDER_STATUSES[s]}
+            for i, (p, q, s) in enumerate(zip(
+                prices[: args.dict_orders].tolist(),
+                quantities[: args.dict_orders].tolist(),
+                statuses[: args.dict_orders].tolist(),
+            ))
+        }
+
+    table, table_bytes = measure("table", args.orders, build_table)
+    orders, dict_bytes = measure("dict", args.dict_orders, build_dict)
+    print(f"dict scaled to {args.orders:,} orders: {dict_bytes / args.dict_orders * args.orders / 2**20:,.1f} MiB"
+          f" ({dict_bytes / args.dict_orders * args.orders / table_bytes:.1f}x the table)")
+
+    ids = rng.integers(0, args.dict_orders, args.lookups).tolist()
+    it = iter(ids * 2)
+    for label, fn in (("table", lambda: table.get(next(it))), ("dict", lambda: orders.get(next(it)))):
+        timings = timed(fn, args.lookups)
+        print(f"lookup {label:<6} p50 {percentile(timings, 0.5) * 1000:.2f}us  p99 {percentile(timings, 0.99) * 1000:.2f}us")
+
+    low, high = 3.0, 3.1 # about 1% of the orders
+    for label, fn, count in (
+        ("table", lambda: table.price_range(low, high, 100), args.orders),
+        ("dict", lambda: [i for i, o in orders.items() if low <= o["price"] <= high][:100], args.dict_orders),
+    ):
+        timings = timed(fn, args.range_queries)
+        print(
+            f"range  {label:<6} over {count:>12,} orders  p50 {percentile(timings, 0.5):.1f}ms"
+            f"  p99 {percentile(timings, 0.99):.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# cost of FilterParams validation with and without QueryModelCache, 07_query_param_models
+
+'''
+1. direct: FilterParams.model_validate on the extracted params vs a cache hit
+2. ASGI: two routes with the same tiny handler, one with the usual
+   Annotated[FilterParams, Query()] and one with the cached dependency
+
+usage (from the repo root):
+    python 03_benchmarks/07_query_model_cache.py
+'''
+
+import argparse
+import asyncio
+import time
+from typing import Annotated
+from urllib.parse import parse_qsl
+
+from fastapi import Depends, FastAPI, Query
+
+from asgi_bench import TUTORIAL_DIR, bench_route, encode_request, load_module, percentile
+
+DASHBOARD_QUERY = {"limit": 50, "offset": 100, "order_by": "updatedat", "tags": ["sale", "new", "featured"]}
+
+
+def timed(fn, repeat: int) -> list[int]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        timings.append(time.perf_counter_ns() - start)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "07_query_param_models.py")
+    cache = module.QueryModelCache(module.FilterParams)
+    scope, body = encode_request({
+        "route": "/", "method": "GET", "path": {}, "query": DASHBOARD_QUERY, "headers": {}, "cookies": {},
+    })
+    query_string = scope["query_string"].decode()
+    params = parse_qsl(query_string)
+
+    cache.lookup(query_string)
+    for label, fn in (
+        ("validate", lambda: cache.validate(params)),
+        ("cache hit", lambda: cache.lookup(query_string)),
+    ):
+        timings = timed(fn, args.repeat)
+        print(f"{label:<10} p50 {percentile(timings, 0.5) * 1000:.2f}us  p99 {percentile(timings, 0.99) * 1000:.2f}us")
+
+    app = FastAPI()
+
+    @app.get("/native")
+    async def native(filter_query: Annotated[module.FilterParams, Query()]):
+        return {"limit": filter_query.limit}
+
+    @app.get("/cached")
+    async def cached(filter_query: Annotated[module.FilterParams, Depends(cache.dependency)]):
+        return {"limit": filter_query.limit}
+
+    for route in ("/native", "/cached"):
+        result = asyncio.run(bench_route(app, {}, {**scope, "path": route, "raw_path": route.encode()}, body, args.requests, 200, 1))
+        print(f"GET {route:<8} {result['rps']:>9.1f} req/s  p50 {result['p50_ms'] * 1000:.1f}us  p99 {result['p99_ms'] * 1000:.1f}us")
+    print(f"cache stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# flood of oversized bodies against PUT /items/{item_id}, with and without @body_budget, 09_body_fields
+
+'''
+every request uploads --size bytes in 64 KiB chunks, --concurrency at a time:
+1. no budget: the same endpoint on a plain FastAPI app, the body is read in
+   full before validation rejects it
+2. budget: the tutorial's route, rejected from Content-Length or after the
+   first chunks when streaming without it (chunked upload)
+
+peak memory is measured with tracemalloc (python allocations only)
+
+usage (from the repo root):
+    python 03_benchmarks/09_body_budget.py
+    python 03_benchmarks/09_body_budget.py --size 50000000 --requests 100
+'''
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Annotated
+
+from fastapi import Body, FastAPI
+
+from asgi_bench import TUTORIAL_DIR, load_module
+
+CHUNK = b"x" * 65536
+
+
+def upload_scope(size: int | None) -> dict:
+    headers = [(b"host", b"testserver"), (b"content-type", b"application/json")]
+    if size is not None:
+        headers.append((b"content-length", str(size).encode()))
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "PUT", "scheme": "http",
+        "path": "/items/1", "raw_path": b"/items/1", "query_string": b"", "headers": headers,
+        "server": ("testserver", 80), "client": ("testclient", 50000), "root_path": "",
+    }
+
+
+async def upload(app, size: int, send_content_length: bool) -> tuple[int, int]:
+    # returns (status, bytes the app actually pulled)
+    chunks = -(-size // len(CHUNK))
+    pulled = 0
+    status = 0
+
+    async def receive():
+        nonlocal pulled
+        if pulled >= chunks:
+            return {"type": "http.disconnect"}
+        pulled += 1
+        await asyncio.sleep(0) # the next chunk arrives from the network
+        return {"type": "http.request", "body": CHUNK, "more_body": pulled < chunks}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(upload_scope(size if send_content_length else None), receive, send)
+    return status, pulled * len(CHUNK)
+
+
+async def flood(app, args, send_content_length: bool) -> dict:
+    statuses: dict[int, int] = {}
+    read = 0
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining, read
+        while remaining > 0:
+            remaining -= 1
+            status, pulled = await upload(app, args.size, send_content_length)
+            statuses[status] = statuses.get(status, 0) + 1
+            read += pulled
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rps": args.requests / elapsed, "peak_mb": peak / 2**20, "read_mb": read / 2**20, "statuses": statuses}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=8 * 2**20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["ITEMS_DB"] = str(Path(tmp) / "items.db")
+        module = load_module(TUTORIAL_DIR / "09_body_fields.py")
+        plain = FastAPI()
+
+        @plain.put("/items/{item_id}")
+        async def update_item(item_id: int, item: Annotated[module.Item, Body(embed=True)]):
+            return {"item_id": item_id, "item": item}
+
+        budget = next(route.max_body_bytes for route in module.app.routes if getattr(route, "max_body_bytes", None))
+        print(f"{args.requests} uploads of {args.size:,} bytes, concurrency {args.concurrency}, budget {budget:,} bytes")
+        for label, app in (("no budget", plain), ("budget", module.app)):
+            for send_content_length in (True, False):
+                result = await flood(app, args, send_content_length)
+                mode = "content-length" if send_content_length else "chunked"
+                print(
+                    f"  {label:<10} {mode:<15} {result['rps']:>8.1f} req/s  peak {result['peak_mb']:>8.1f} MiB  "
+                    f"read {result['read_mb']:>9.1f} MiB  {result['statuses']}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+# PUT /items/{item_id} throughput: write-behind store vs one commit per request, 09_body_fields
+
+'''
+both apps run the same handler on the same WAL-mode SQLite settings:
+1. commit per request: the handler writes its row and commits (in a thread)
+   before answering
+2. write-behind: the tutorial's store, acknowledged once queued, flushed in
+   grouped transactions by the background task
+
+item ids are drawn from --items ids, so a smaller range means more writes
+coalesce in one flush window
+
+usage (from the repo root):
+    python 03_benchmarks/09_write_behind.py
+    python 03_benchmarks/09_write_behind.py --items 100000 --concurrency 256
+'''
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated
+
+from fastapi import Body, FastAPI
+
+from asgi_bench import TUTORIAL_DIR, Lifespan, call, encode_request, load_module, percentile
+
+
+def commit_per_request_app(module, path: str) -> FastAPI:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS items (item_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+    lock = asyncio.Lock() # one sqlite writer at a time, like the store
+
+    def write(item_id: int, data: str):
+        with connection:
+            connection.execute(
+                "INSERT INTO items (item_id, data) VALUES (?, ?) ON CONFLICT (item_id) DO UPDATE SET data = excluded.data",
+                (item_id, data),
+            )
+
+    app = FastAPI()
+
+    @app.put("/items/{item_id}")
+    async def update_item(item_id: int, item: Annotated[module.Item, Body(embed=True)]):
+        async with lock:
+            await asyncio.to_thread(write, item_id, item.model_dump_json())
+        return {"item_id": item_id, "item": item}
+
+    return app
+
+
+async def run(app, requests: list[tuple[dict, bytes]], concurrency: int) -> dict:
+    latencies = []
+    statuses: dict[int, int] = {}
+    pending = iter(requests)
+
+    async def worker():
+        for scope, body in pending:
+            start = time.perf_counter_ns()
+            status = await call(app, scope, body, {})
+            latencies.append(time.perf_counter_ns() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            await asyncio.sleep(0) # a real server goes back to the event loop between requests
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"rps": len(latencies) / elapsed, "p50_ms": percentile(latencies, 0.5), "p99_ms": percentile(latencies, 0.99), "statuses": statuses}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["ITEMS_DB"] = str(Path(tmp) / "write_behind.db")
+        module = load_module(TUTORIAL_DIR / "09_body_fields.py")
+        rng = random.Random(0)
+        requests = [
+            encode_request({
+                "route": "/items/{item_id}", "method": "PUT", "path": {"item_id": rng.randrange(1, args.items + 1)},
+                "query": {}, "headers": {}, "cookies": {},
+                "json": {"item": {"name": "Foo", "description": "A very nice Item", "price": round(rng.uniform(1, 100), 2), "tax": 3.2}},
+            })
+            for _ in range(args.requests)
+        ]
+
+        baseline = commit_per_request_app(module, str(Path(tmp) / "commit_per_request.db"))
+        result = await run(baseline, requests, args.concurrency)
+        print(f"commit per request {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms  {result['statuses']}")
+
+        async with Lifespan(module.app):
+            result = await run(module.app, requests, args.concurrency)
+            stats = dict(module.store.stats)
+        print(f"write-behind       {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms  {result['statuses']}")
+        print(f"store: {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
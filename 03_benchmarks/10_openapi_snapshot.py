@@ -0,0 +1,83 @@
+# worker startup and first /openapi.json latency: lazy vs built at startup vs snapshot, 10_declare_request_example_data
+
+'''
+every run is a fresh python process (like a new worker), nothing is warm:
+1. lazy: the tutorial's routes on a stock FastAPI app, schema built on the first hit
+2. startup: the tutorial app, schema built in the lifespan
+3. snapshot: the tutorial app with OPENAPI_SNAPSHOT, schema read from disk
+
+startup = tutorial module import + lifespan startup (fastapi itself is imported
+before), first = the first GET /openapi.json
+
+usage (from the repo root):
+    python 03_benchmarks/10_openapi_snapshot.py
+    python 03_benchmarks/10_openapi_snapshot.py --runs 21
+'''
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from asgi_bench import TUTORIAL_DIR
+
+MODULE = TUTORIAL_DIR / "10_declare_request_example_data.py"
+
+
+async def measure(mode: str) -> dict:
+    from fastapi import FastAPI # the framework import is the same for every mode, not timed
+    from asgi_bench import Lifespan, call, encode_request, load_module
+
+    started = time.perf_counter()
+    module = load_module(MODULE)
+    app = module.app
+    if mode == "lazy":
+        app = FastAPI()
+        app.router.routes.extend(route for route in module.app.routes if getattr(route, "include_in_schema", False))
+    async with Lifespan(app) as lifespan:
+        startup = time.perf_counter() - started
+        scope, body = encode_request({
+            "route": "/openapi.json", "method": "GET", "path": {}, "query": {},
+            "headers": {"accept-encoding": "gzip"}, "cookies": {},
+        })
+        first_started = time.perf_counter()
+        status = await call(app, scope, body, lifespan.state)
+        first = time.perf_counter() - first_started
+    return {"startup_ms": startup * 1000, "first_ms": first * 1000, "status": status}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=11)
+    parser.add_argument("--child", choices=["lazy", "startup", "snapshot"])
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.child))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = str(Path(tmp) / "openapi.json.gz")
+        subprocess.run([sys.executable, str(MODULE), "snapshot", snapshot], check=True, capture_output=True)
+        for mode in ("lazy", "startup", "snapshot"):
+            env = {**os.environ, "OPENAPI_SNAPSHOT": snapshot} if mode == "snapshot" else os.environ
+            runs = [
+                json.loads(subprocess.run(
+                    [sys.executable, __file__, "--child", mode], env=env, check=True, capture_output=True, text=True,
+                ).stdout)
+                for _ in range(args.runs)
+            ]
+            assert {run["status"] for run in runs} == {200}
+            startup = statistics.median(run["startup_ms"] for run in runs)
+            first = statistics.median(run["first_ms"] for run in runs)
+            print(f"{mode:<9} startup {startup:8.2f}ms  first /openapi.json {first:8.3f}ms  total {startup + first:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
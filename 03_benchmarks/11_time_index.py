@@ -0,0 +1,78 @@
+# ItemTimeIndex at scale: memory per item and "active between" latency, 11_extra_data_types
+
+'''
+loads --items random UUID items (start within a year, 1 min to 8 h long) in
+chunks through ItemTimeIndex.extend, then times active(t1, t2) for windows of
+different widths against a full scan of the two datetime columns
+
+memory = tracemalloc (numpy buffers included) after the load, per item
+
+usage (from the repo root):
+    python 03_benchmarks/11_time_index.py                  # 50M items, ~3.3 GiB peak
+    python 03_benchmarks/11_time_index.py --items 5000000
+'''
+
+import argparse
+import time
+import tracemalloc
+from datetime import timedelta
+
+import numpy as np
+
+from asgi_bench import TUTORIAL_DIR, load_module
+
+YEAR_US = 365 * 86_400 * 10**6
+WINDOWS = {"1 min": timedelta(minutes=1), "1 hour": timedelta(hours=1), "1 day": timedelta(days=1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50_000_000)
+    parser.add_argument("--chunk", type=int, default=5_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "11_extra_data_types.py")
+    rng = np.random.default_rng(0)
+    epoch = np.datetime64("2026-01-01T00:00:00", "us")
+
+    tracemalloc.start()
+    index = module.ItemTimeIndex(capacity=args.items)
+    started = time.perf_counter()
+    for begin in range(0, args.items, args.chunk):
+        size = min(args.chunk, args.items - begin)
+        keys = rng.integers(0, 2**64, size=(size, 2), dtype=np.uint64)
+        starts = epoch + rng.integers(0, YEAR_US, size=size).astype("timedelta64[us]")
+        ends = starts + rng.integers(60 * 10**6, 8 * 3600 * 10**6, size=size).astype("timedelta64[us]")
+        index.extend(keys, starts, ends)
+        del keys, starts, ends
+    load = time.perf_counter() - started
+    memory, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(index):,} items loaded in {load:.1f}s: {memory / len(index):.1f} bytes per item "
+          f"({memory / 2**30:.2f} GiB), peak {peak / 2**30:.2f} GiB")
+
+    starts, ends = index.starts[: index.size], index.ends[: index.size]
+    for label, width in WINDOWS.items():
+        timings, totals = [], []
+        for _ in range(args.queries):
+            t1 = (epoch + np.timedelta64(int(rng.integers(0, YEAR_US)), "us")).tolist()
+            t2 = t1 + width
+            started = time.perf_counter_ns()
+            total, _ = index.active(t1, t2, args.limit)
+            timings.append(time.perf_counter_ns() - started)
+            totals.append(total)
+        timings.sort()
+        scans = []
+        for _ in range(3):
+            t1 = epoch + np.timedelta64(int(rng.integers(0, YEAR_US)), "us")
+            started = time.perf_counter_ns()
+            np.count_nonzero((starts < t1 + np.timedelta64(width)) & (ends > t1))
+            scans.append(time.perf_counter_ns() - started)
+        print(f"window {label:<7} ~{int(np.mean(totals)):>9,} active  index p50 {timings[len(timings) // 2] / 1e6:8.3f}ms  "
+              f"p99 {timings[len(timings) * 99 // 100] / 1e6:8.3f}ms  full scan {min(scans) / 1e6:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# timer wheel scheduler: memory per pending timer, insert/cancel rate and firing jitter, 11_extra_data_types
+
+'''
+1. --timers pending timers spread over the next hour (one shared job): insert
+   rate, memory per timer (tracemalloc), cancel rate for half of them
+2. with those still pending, --fire timers due within the next few seconds:
+   how late each one runs (fire time - deadline, measured inside the job)
+
+usage (from the repo root):
+    python 03_benchmarks/11_timer_wheel.py
+    python 03_benchmarks/11_timer_wheel.py --timers 5000000 --fire 50000
+'''
+
+import argparse
+import asyncio
+import gc
+import random
+import time
+import tracemalloc
+
+from asgi_bench import TUTORIAL_DIR, load_module
+
+
+async def noop():
+    pass
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timers", type=int, default=1_000_000)
+    parser.add_argument("--fire", type=int, default=20_000)
+    parser.add_argument("--window", type=float, default=3.0, help="seconds over which the --fire timers are due")
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "11_extra_data_types.py")
+    scheduler = module.TimerWheelScheduler()
+    scheduler.start()
+    rng = random.Random(0)
+    now = scheduler.now()
+    deadlines = [now + 10_000 + rng.randrange(3_600_000) for _ in range(args.timers)]
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    timers = [scheduler.schedule(deadline, noop) for deadline in deadlines]
+    elapsed = time.perf_counter() - started
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    list_bytes = 8 * len(timers) # the benchmark's own list of handles
+    print(f"{args.timers:,} timers: insert {args.timers / elapsed:,.0f}/s, "
+          f"{(memory - list_bytes) / args.timers:.0f} bytes per pending timer, {scheduler.levels()} wheel levels")
+
+    started = time.perf_counter()
+    for timer in timers[::2]:
+        scheduler.cancel(timer)
+    elapsed = time.perf_counter() - started
+    print(f"cancel {len(timers[::2]) / elapsed:,.0f}/s, {scheduler.pending:,} still pending")
+
+    lateness_ms = []
+    done = asyncio.Event()
+
+    def job(deadline: int):
+        async def run():
+            lateness_ms.append(time.time_ns() / 1e6 - deadline)
+            if len(lateness_ms) == args.fire:
+                done.set()
+        return run
+
+    now = scheduler.now()
+    for _ in range(args.fire):
+        deadline = now + 100 + rng.randrange(int(args.window * 1000))
+        scheduler.schedule(deadline, job(deadline))
+    await asyncio.wait_for(done.wait(), args.window + 10)
+    lateness_ms.sort()
+    pick = lambda p: lateness_ms[min(len(lateness_ms) - 1, int(p * len(lateness_ms)))]
+    print(f"{args.fire:,} timers fired over {args.window:g}s: lateness p50 {pick(0.5):.2f}ms  "
+          f"p99 {pick(0.99):.2f}ms  p99.9 {pick(0.999):.2f}ms  max {lateness_ms[-1]:.2f}ms")
+    await scheduler.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+# TokenCache: cached lookups vs HMAC verification, concurrent verification of several tokens, 13_header_params
+
+'''
+1. one lookup: TokenCache.get on a cached token (accepted and rejected), vs
+   verifying the HMAC token each time
+2. a request's tokens: verify_all over --tokens cached tokens, and over
+   uncached ones with a verifier that waits --latency seconds (a remote auth
+   service), verified concurrently vs one after the other
+
+usage (from the repo root):
+    python 03_benchmarks/13_token_cache.py
+    python 03_benchmarks/13_token_cache.py --lookups 5000000 --tokens 8
+'''
+
+import argparse
+import asyncio
+import time
+
+from asgi_bench import TUTORIAL_DIR, load_module
+
+
+class SlowVerifier:
+    def __init__(self, verifier, latency: float):
+        self.verifier = verifier
+        self.latency = latency
+
+    async def verify(self, token: str):
+        await asyncio.sleep(self.latency)
+        return await self.verifier.verify(token)
+
+
+def run_inline(coroutine):
+    # the HMAC verifier never suspends: run it without an event loop round trip
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+
+def per_call_ns(fn, n: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - started) / n
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    parser.add_argument("--tokens", type=int, default=4, help="X-Token values per request")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per remote verification")
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "13_header_params.py")
+    verifier = module.token_verifier
+    cache = module.TokenCache()
+    good = verifier.issue("alice")
+    bad = good[:-2] + "xx"
+    cache.put(good, await verifier.verify(good))
+    cache.put(bad, None)
+
+    print(f"get, accepted      {per_call_ns(lambda: cache.get(good), args.lookups):>10.0f} ns")
+    print(f"get, rejected      {per_call_ns(lambda: cache.get(bad), args.lookups):>10.0f} ns")
+    verify_ns = per_call_ns(lambda: run_inline(verifier.verify(good)), args.lookups // 10)
+    print(f"hmac verify        {verify_ns:>10.0f} ns")
+
+    tokens = [verifier.issue(f"user{i}") for i in range(args.tokens)]
+    for token in tokens:
+        cache.put(token, await verifier.verify(token))
+    n = args.lookups // 10
+    started = time.perf_counter_ns()
+    for _ in range(n):
+        await cache.verify_all(verifier, tokens)
+    print(f"verify_all, {args.tokens} cached {(time.perf_counter_ns() - started) / n:>9.0f} ns")
+
+    slow = SlowVerifier(verifier, args.latency)
+    fresh = module.TokenCache()
+    started = time.perf_counter()
+    await fresh.verify_all(slow, [verifier.issue(f"new{i}") for i in range(args.tokens)])
+    concurrent_ms = (time.perf_counter() - started) * 1e3
+    started = time.perf_counter()
+    for i in range(args.tokens):
+        await slow.verify(verifier.issue(f"seq{i}"))
+    sequential_ms = (time.perf_counter() - started) * 1e3
+    print(f"{args.tokens} uncached, remote  concurrent {concurrent_ms:.1f} ms  sequential {sequential_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
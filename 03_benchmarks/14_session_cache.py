@@ -0,0 +1,70 @@
+# ShardedSessionCache under threads: one lock vs per-shard locks, hit rate vs capacity, 14_cookie_param_models
+
+'''
+--threads threads look up session ids drawn from a skewed (zipf-like)
+distribution over --sessions ids, against caches with 1 shard (one global
+lock) and with SHARDS shards. Misses are filled from an in-memory dict, the
+sqlite file is left out to time the cache itself.
+
+usage (from the repo root):
+    python 03_benchmarks/14_session_cache.py
+    python 03_benchmarks/14_session_cache.py --threads 16 --capacity 20000
+'''
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from asgi_bench import TUTORIAL_DIR, load_module
+
+
+def run(cache, module, sessions: dict, ids: list[list[str]]) -> float:
+    barrier = threading.Barrier(len(ids) + 1)
+
+    def worker(thread_ids: list[str]):
+        barrier.wait()
+        for session_id in thread_ids:
+            if cache.get(session_id) is module.MISSING:
+                cache.put(session_id, sessions.get(session_id))
+
+    threads = [threading.Thread(target=worker, args=(thread_ids,)) for thread_ids in ids]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return sum(map(len, ids)) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=200_000, help="per thread")
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--capacity", type=int, default=50_000)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "14_cookie_param_models.py") # the sqlite file is only opened by the app's lifespan
+    expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+    names = [f"session-{i}" for i in range(args.sessions)]
+    sessions = {name: module.Session(session_id=name, username="dave", expires_at=expires_at) for name in names}
+    rng = np.random.default_rng(0)
+    ids = [
+        [names[i] for i in (rng.zipf(1.2, args.lookups) - 1) % args.sessions]
+        for _ in range(args.threads)
+    ]
+
+    print(f"{args.threads} threads x {args.lookups:,} lookups over {args.sessions:,} sessions, capacity {args.capacity:,}")
+    for shards in (1, module.SHARDS):
+        cache = module.ShardedSessionCache(capacity=args.capacity, shards=shards)
+        rate = run(cache, module, sessions, ids)
+        stats = cache.stats()
+        print(f"  {shards:>2} shard(s) {rate:>12,.0f} lookups/s  hit rate {stats['hit_rate']:.3f}  evictions {stats['evictions']:,}")
+
+
+if __name__ == "__main__":
+    main()
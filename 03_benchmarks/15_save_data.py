@@ -0,0 +1,86 @@
+# compact and compressed JSON for Save-Data and gzip clients: per-request gzip vs the encoded body cache, 15_header_param_models
+
+'''
+GET /items/ with X_TAG_COUNT x-tag headers, so the echoed body is a few KB:
+1. identity: the tutorial app, no Save-Data, no Accept-Encoding (passes through)
+2. gzip per request: the same endpoint on a stock FastAPI app behind
+   Starlette's GZipMiddleware (compresses every response)
+3. gzip cached / save-data / save-data + gzip: the tutorial app, the encoded
+   body comes from the cache after the first request
+
+tracing is off (TRACE_SAMPLE_RATE=0) so only the encoding is measured.
+
+usage (from the repo root):
+    python 03_benchmarks/15_save_data.py
+    python 03_benchmarks/15_save_data.py --requests 50000 --tags 500
+'''
+
+import argparse
+import asyncio
+import os
+from typing import Annotated
+
+from fastapi import FastAPI, Header
+from fastapi.middleware.gzip import GZipMiddleware
+
+from asgi_bench import TUTORIAL_DIR, bench_route, encode_request, load_module
+
+X_TAG_COUNT = 200
+
+
+async def response_size(app, scope: dict, body: bytes) -> int:
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app({**scope, "state": {}}, receive, send)
+    return size
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--warmup", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--tags", type=int, default=X_TAG_COUNT)
+    args = parser.parse_args()
+
+    os.environ["TRACE_SAMPLE_RATE"] = "0"
+    module = load_module(TUTORIAL_DIR / "15_header_param_models.py")
+    plain = FastAPI()
+    plain.add_middleware(GZipMiddleware)
+
+    @plain.get("/items/")
+    async def read_items(headers: Annotated[module.MainHeaders, Header()]):
+        return headers
+
+    tags = [f"tag-{i:04d}" for i in range(args.tags)]
+    cases = {
+        "identity": (module.app, {}),
+        "gzip per request": (plain, {"accept-encoding": "gzip"}),
+        "gzip cached": (module.app, {"accept-encoding": "gzip"}),
+        "save-data": (module.app, {"save-data": "on"}),
+        "save-data + gzip": (module.app, {"save-data": "on", "accept-encoding": "gzip"}),
+    }
+    for label, (app, headers) in cases.items():
+        scope, body = encode_request({
+            "route": "/items/", "method": "GET", "path": {}, "query": {},
+            "headers": {"save-data": "off", **headers, "x-tag": tags}, "cookies": {},
+        })
+        size = await response_size(app, scope, body)
+        result = await bench_route(app, {}, scope, body, args.requests, args.warmup, args.concurrency)
+        print(
+            f"{label:<18} {size:>7} B {result['rps']:>10.1f} req/s  p50 {result['p50_ms']:.4f}ms  "
+            f"p99 {result['p99_ms']:.4f}ms  {result['statuses']}"
+        )
+    print("body cache:", module.body_cache.stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
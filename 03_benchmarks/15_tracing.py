@@ -0,0 +1,81 @@
+# tracing overhead on GET /items/ at different sample rates, 15_header_param_models
+
+'''
+the same endpoint on a plain FastAPI app (no tracing) vs the tutorial app at
+several TRACE_SAMPLE_RATEs, exporter thread running. new traces only (no
+incoming traceparent), plus one case where every request carries an unsampled
+traceparent (the caller decided).
+
+the apps take turns for --rounds rounds, the reported p50/p99 are the medians
+over the rounds, so a slow moment of the machine doesn't land on one app only.
+
+usage (from the repo root):
+    python 03_benchmarks/15_tracing.py
+    python 03_benchmarks/15_tracing.py --rounds 15 --requests 20000
+'''
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+from pathlib import Path
+
+from fastapi import FastAPI
+
+from asgi_bench import TUTORIAL_DIR, Lifespan, bench_route, encode_request, load_module
+
+RATES = (0.0, 0.01, 0.1, 1.0)
+UNSAMPLED = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--requests", type=int, default=10_000, help="per app and round")
+    parser.add_argument("--warmup", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TRACE_FILE"] = str(Path(tmp) / "traces.jsonl")
+        modules = {}
+        for rate in RATES:
+            os.environ["TRACE_SAMPLE_RATE"] = str(rate)
+            modules[rate] = load_module(TUTORIAL_DIR / "15_header_param_models.py")
+        plain = FastAPI()
+        plain.get("/items/")(modules[0.0].read_items)
+
+        headers = {"save-data": "on", "x-tag": "a"}
+        with_parent = {**headers, "traceparent": UNSAMPLED}
+        # label -> (app, headers, the label it is compared with)
+        cases = {"no tracing": (plain, headers, "no tracing")}
+        for rate, module in modules.items():
+            cases[f"sample {rate:g}"] = (module.app, headers, "no tracing")
+        cases["no tracing, parent"] = (plain, with_parent, "no tracing, parent") # MainHeaders parses it too
+        cases["unsampled parent"] = (modules[1.0].app, with_parent, "no tracing, parent")
+
+        lifespans = [Lifespan(module.app) for module in modules.values()]
+        for lifespan in lifespans:
+            await lifespan.__aenter__()
+        results: dict[str, list[dict]] = {label: [] for label in cases}
+        for _ in range(args.rounds):
+            for label, (app, request_headers, _) in cases.items():
+                scope, body = encode_request({
+                    "route": "/items/", "method": "GET", "path": {}, "query": {}, "headers": request_headers, "cookies": {},
+                })
+                results[label].append(await bench_route(app, {}, scope, body, args.requests, args.warmup, 1))
+        for lifespan in lifespans:
+            await lifespan.__aexit__(None, None, None)
+
+        median = lambda label, metric: statistics.median(r[metric] for r in results[label])
+        for label, (_, _, baseline) in cases.items():
+            p50, p99 = median(label, "p50_ms"), median(label, "p99_ms")
+            base_p50, base_p99 = median(baseline, "p50_ms"), median(baseline, "p99_ms")
+            print(f"{label:<19} p50 {p50:.4f}ms ({p50 / base_p50 - 1:+6.1%})  p99 {p99:.4f}ms ({p99 / base_p99 - 1:+6.1%})")
+        spans = sum(1 for _ in open(os.environ["TRACE_FILE"]))
+        dropped = sum(module.trace_ring.dropped for module in modules.values())
+        print(f"{spans:,} spans exported, {dropped:,} traces dropped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
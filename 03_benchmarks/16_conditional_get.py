@@ -0,0 +1,64 @@
+# polling an unchanged item: full 200 vs 304 from If-None-Match / If-Modified-Since, 16_response_model
+
+'''
+GET /items3/bar as a polling client sends it:
+1. plain: the same routes on a stock FastAPI app (no validators at all)
+2. first poll: the tutorial route, no validator yet (200 + ETag/Last-Modified)
+3. stale: a validator that doesn't match (200)
+4. If-None-Match / If-Modified-Since matching the current version (304,
+   the handler, validation and serialization are skipped)
+
+usage (from the repo root):
+    python 03_benchmarks/16_conditional_get.py
+    python 03_benchmarks/16_conditional_get.py --requests 50000 --concurrency 8
+'''
+
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+
+from asgi_bench import TUTORIAL_DIR, bench_route, encode_request, load_module
+
+
+def poll(headers: dict) -> tuple[dict, bytes]:
+    return encode_request({
+        "route": "/items3/{item_id}", "method": "GET", "path": {"item_id": "bar"}, "query": {},
+        "headers": headers, "cookies": {},
+    })
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--warmup", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "16_response_model.py")
+    plain = FastAPI()
+    for route in module.app.routes: # same routing table, so matching costs the same
+        if getattr(route, "endpoint", None) is module.read_item:
+            plain.get(route.path, response_model=module.Item2, response_model_exclude_unset=True)(module.read_item)
+        elif getattr(route, "include_in_schema", False):
+            plain.router.routes.append(route)
+    version = module.item_versions.get("bar")
+
+    cases = {
+        "plain": (plain, {}),
+        "first poll": (module.app, {}),
+        "stale etag": (module.app, {"if-none-match": '"0-0"'}),
+        "if-none-match": (module.app, {"if-none-match": version.etag}),
+        "if-modified-since": (module.app, {"if-modified-since": version.http_date}),
+    }
+    for label, (app, headers) in cases.items():
+        scope, body = poll(headers)
+        result = await bench_route(app, {}, scope, body, args.requests, args.warmup, args.concurrency)
+        print(
+            f"{label:<18} {result['rps']:>10.1f} req/s  p50 {result['p50_ms']:.4f}ms  "
+            f"p99 {result['p99_ms']:.4f}ms  {result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+# large list[Item] responses: one body vs a streamed JSON array / NDJSON, 16_response_model
+
+'''
+--rows Item rows made on the fly by an async generator (a database cursor):
+1. list: the handler collects them into a list, FastAPI validates and
+   serializes it as one body
+2. array / ndjson: the handler returns the generator, StreamingListRoute
+   streams it (Accept: application/json or application/x-ndjson)
+
+time to first byte, total time and body size come from one timed request.
+peak memory is traced (tracemalloc) on a second request, it slows it down.
+
+usage (from the repo root):
+    python 03_benchmarks/16_list_stream.py
+    python 03_benchmarks/16_list_stream.py --rows 1000000
+'''
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+
+from asgi_bench import TUTORIAL_DIR, encode_request, load_module
+
+
+async def timed_call(app, scope: dict, body: bytes) -> tuple[float, float, int]:
+    # (time to first byte, total time) in seconds, body bytes
+    first_byte = None
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal first_byte, size
+        if message["type"] == "http.response.body":
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            size += len(message.get("body", b""))
+
+    started = time.perf_counter()
+    await app({**scope, "state": {}}, receive, send)
+    return first_byte - started, time.perf_counter() - started, size
+
+
+async def traced_peak(app, scope: dict, body: bytes) -> int:
+    tracemalloc.start()
+    try:
+        await timed_call(app, scope, body)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "16_response_model.py")
+
+    async def rows():
+        for i in range(args.rows):
+            yield {"name": f"Item {i}", "description": "The item", "price": i / 10, "tax": 1.5, "tags": ["item"]}
+
+    app = FastAPI()
+    app.router.route_class = module.StreamingListRoute
+
+    @app.get("/list", response_model=list[module.Item])
+    async def read_list():
+        return [row async for row in rows()]
+
+    @app.get("/stream", response_model=list[module.Item])
+    async def read_stream():
+        return rows()
+
+    cases = {
+        "list": ("/list", "application/json"),
+        "array": ("/stream", "application/json"),
+        "ndjson": ("/stream", "application/x-ndjson"),
+    }
+    for label, (route, accept) in cases.items():
+        scope, body = encode_request({
+            "route": route, "method": "GET", "path": {}, "query": {}, "headers": {"accept": accept}, "cookies": {},
+        })
+        ttfb, total, size = await timed_call(app, scope, body)
+        peak = await traced_peak(app, scope, body)
+        print(
+            f"{label:<7} ttfb {ttfb * 1e3:>9.2f}ms  total {total * 1e3:>9.1f}ms  "
+            f"{size / 2**20:>7.1f} MiB body  peak {peak / 2**20:>7.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+# list[Item] responses: validated then serialized vs @trusted_return, 16_response_model
+
+'''
+a handler returning --items prebuilt Item instances, response model list[Item]:
+1. stock: a plain FastAPI route (validated against list[Item], then serialized)
+2. trusted: the same handler marked with @trusted_return on FastReturnRoute
+3. the same two routes returning dicts: the trusted route takes the safe path,
+   the difference is the cost of the exact-type check when it fails
+
+usage (from the repo root):
+    python 03_benchmarks/16_trusted_return.py
+    python 03_benchmarks/16_trusted_return.py --items 100000 --requests 200
+'''
+
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+
+from asgi_bench import TUTORIAL_DIR, bench_route, encode_request, load_module
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    module = load_module(TUTORIAL_DIR / "16_response_model.py")
+    items = [
+        module.Item(name=f"Item {i}", description="The item", price=i / 10, tax=1.5, tags=["item", str(i % 7)])
+        for i in range(args.items)
+    ]
+    dicts = [item.model_dump() for item in items]
+
+    async def read_items() -> list[module.Item]:
+        return items
+
+    async def read_dicts() -> list[module.Item]:
+        return dicts
+
+    apps = {}
+    for label, endpoint in {"models": read_items, "dicts": read_dicts}.items():
+        stock = apps[f"stock, {label}"] = FastAPI()
+        stock.get("/items/")(endpoint)
+        trusted = apps[f"trusted, {label}"] = FastAPI()
+        trusted.router.route_class = module.FastReturnRoute
+        trusted.get("/items/")(module.trusted_return(endpoint))
+
+    scope, body = encode_request({
+        "route": "/items/", "method": "GET", "path": {}, "query": {}, "headers": {}, "cookies": {},
+    })
+    for label, app in apps.items():
+        result = await bench_route(app, {}, scope, body, args.requests, args.warmup, 1)
+        print(
+            f"{label:<18} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:.3f}ms  "
+            f"p99 {result['p99_ms']:.3f}ms  {result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,523 @@
+# in-process ASGI benchmark for every 02_tutorial app
+
+'''
+Imports the `app` of each 02_tutorial module and calls it directly over ASGI
+(no sockets, no HTTP client), one request shape per declared route.
+
+Request shapes come from the app's own OpenAPI schema: path/query/header/cookie
+parameters and request bodies are filled from `examples`, defaults and the
+declared constraints (ge/le, min_length, enums...). Routes that need a specific
+value (a regex pattern, a key that must exist in a dict) are listed in OVERRIDES,
+values the app issues itself (an auth token) are made by its module (FromModule).
+
+usage (from the repo root):
+    python 03_benchmarks/asgi_bench.py                         # every module
+    python 03_benchmarks/asgi_bench.py 04 07 --requests 5000  # modules by prefix
+    python 03_benchmarks/asgi_bench.py --save baseline.json
+    python 03_benchmarks/asgi_bench.py --compare baseline.json --threshold 0.25
+
+--compare exits with status 1 when any route's p50 or p99 latency got slower
+than the baseline by more than --threshold (0.25 = 25%), when a route answers
+with other status codes than in the baseline, or when all its requests raise.
+'''
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType
+from typing import Any, NamedTuple
+from urllib.parse import urlencode
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TUTORIAL_DIR = REPO_ROOT / "02_tutorial"
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+# sqlite files the tutorial apps create, pointed at a temporary directory during a run
+DATABASE_ENV = ("ITEMS_DB", "SESSIONS_DB")
+
+class FromModule(NamedTuple):
+    # an override value the app hands out itself (a token): made once, before the
+    # route is measured, by calling `make` with the loaded tutorial module
+    make: Callable[[ModuleType], Any]
+
+
+# realistic payloads for routes where a generated value would be rejected or boring.
+# keyed by (module stem, "METHOD /openapi/path"), values are merged over the generated request,
+# except "cookies", which replaces the generated jar (a cookie model with extra="forbid"
+# rejects any cookie the override didn't list) and "json".
+ITEM = {"name": "Foo", "description": "A very nice Item", "price": 35.4, "tax": 3.2}
+OVERRIDES: dict[tuple[str, str], dict[str, Any]] = {
+    ("01_simplest", "GET /files/{file_path}"): {"path": {"file_path": "hello.txt"}},
+    ("02_predefined", "POST /models/{model_name}/predict"): {
+        "json": {"features": [round((i % 7) * 0.25 - 0.75, 2) for i in range(64)]},
+    },
+    ("03_query_params", "GET /items/"): {"query": {"skip": 2, "limit": 5}},
+    ("04_request_body", "POST /items/"): {"json": ITEM},
+    ("04_request_body", "PUT /items/{item_id}"): {"json": ITEM},
+    ("04_request_body", "POST /items/bulk"): {"ndjson": [ITEM, {"name": "Bar", "price": 23.5}] * 500},
+    ("04_request_body", "PUT /users/{user_id}/items/{item_id}"): {"json": ITEM, "query": {"q": "foo"}},
+    ("05_query_params_str_validations", "GET /orders/"): {"query": {"q": "fixedquery"}},
+    ("05_query_params_str_validations", "GET /vouchers/"): {"query": {"voucher-code": "VOUCHER-123"}},
+    ("05_query_params_str_validations", "GET /books/"): {"query": {"id": "isbn-9781529046137"}},
+    ("05_query_params_str_validations", "GET /books/autocomplete"): {"query": {"q": "isbn-978"}},
+    ("05_query_params_str_validations", "GET /payments/"): {"query": {"q": ["Pay1", "Pay2", "Pay3"]}},
+    ("06_path_params_num_validations", "GET /orders/{order_id}"): {
+        "path": {"order_id": 42}, "query": {"q": "foo", "price": 9.99},
+    },
+    ("06_path_params_num_validations", "GET /orders/"): {"query": {"min_price": 3.0, "max_price": 3.5}},
+    ("06_path_params_num_validations", "PUT /orders/{order_id}"): {
+        "path": {"order_id": 7}, "json": {"price": 4.2, "quantity": 2, "status": "paid"},
+    },
+    ("07_query_param_models", "GET /items/"): {
+        "query": {"limit": 20, "offset": 40, "order_by": "updatedat", "tags": ["sale", "new"]},
+    },
+    ("07_query_param_models", "GET /strict-items/"): {
+        "query": {"limit": 20, "offset": 0, "order_by": "created_at", "tags": ["sale"]},
+    },
+    ("08_body_multiple_params", "PUT /items/{item_id}"): {"json": ITEM},
+    ("08_body_multiple_params", "PUT /users/{user_id}"): {
+        "json": {"item": ITEM, "user": {"username": "dave", "full_name": "Dave Grohl"}},
+    },
+    ("08_body_multiple_params", "PUT /singular/{singular_id}"): {
+        "json": {"item": ITEM, "user": {"username": "dave", "full_name": "Dave Grohl"}, "importance": 5},
+    },
+    ("08_body_multiple_params", "PUT /multiple/{multiple_id}"): {
+        "json": {"item": ITEM, "user": {"username": "dave", "full_name": "Dave Grohl"}, "importance": 5},
+    },
+    ("08_body_multiple_params", "PUT /embed/{embed_id}"): {"json": {"item": ITEM}},
+    ("09_body_fields", "PUT /items/{item_id}"): {"json": {"item": ITEM}},
+    ("11_extra_data_types", "PUT /items/{item_id}"): {
+        "json": {
+            "start_datetime": "2026-10-18T08:00:00",
+            "end_datetime": "2026-10-18T17:30:00",
+            "process_after": "PT1H30M",
+            "repeat_at": "09:15:00",
+        },
+    },
+    ("13_header_params", "GET /projects/"): {
+        "headers": {"x-token": FromModule(lambda module: module.token_verifier.issue("bench"))},
+    },
+    ("14_cookie_param_models", "GET /cookie/"): {"cookies": {"session_id": "abc123", "facebook": "fb"}},
+    ("14_cookie_param_models", "GET /cookie2/"): {"cookies": {"session_id": "abc123"}},
+    ("15_header_param_models", "GET /items/"): {"headers": {"save-data": "on", "x-tag": "a"}},
+    ("15_header_param_models", "GET /items2/"): {"headers": {"save-data": "on"}},
+    ("16_response_model", "POST /users/"): {
+        "json": {"username": "john", "password": "secret", "email": "john@example.com"},
+    },
+    ("16_response_model", "POST /users2/"): {
+        "json": {"username": "john", "password": "secret", "email": "john@example.com"},
+    },
+    ("16_response_model", "POST /users3/"): {
+        "json": {"username": "john", "password": "secret", "email": "john@example.com"},
+    },
+    ("16_response_model", "GET /items3/{item_id}"): {"path": {"item_id": "bar"}},
+    ("16_response_model", "PUT /items3/{item_id}"): {"path": {"item_id": "bar"}, "json": ITEM},
+    ("16_response_model", "GET /items4/{item_id}/name"): {"path": {"item_id": "bar"}},
+    ("16_response_model", "GET /items4/{item_id}/public"): {"path": {"item_id": "bar"}},
+    ("17_extra_models", "GET /items/{item_id}"): {"path": {"item_id": "item2"}},
+    ("23_handling_errors", "GET /sawit/{sawit_id}"): {"path": {"sawit_id": "sawit"}},
+    ("23_handling_errors", "GET /sawits/{sawit_id}"): {"path": {"sawit_id": "sawit"}},
+}
+
+
+## loading the apps
+
+def load_module(path: Path):
+    # tutorial files start with a digit, so they can't be imported with a plain import
+    spec = importlib.util.spec_from_file_location(f"tutorial_{path.stem}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def discover(prefixes: list[str]) -> list[Path]:
+    paths = sorted(TUTORIAL_DIR.glob("[0-9][0-9]_*.py"))
+    if prefixes:
+        paths = [p for p in paths if p.stem.startswith(tuple(prefixes))]
+    return paths
+
+
+## sample values from JSON schema
+
+def resolve(schema: dict, components: dict) -> dict:
+    while "$ref" in schema:
+        schema = components[schema["$ref"].rsplit("/", 1)[-1]]
+    return schema
+
+
+def sample_value(schema: dict, components: dict) -> Any:
+    schema = resolve(schema, components)
+    if schema.get("examples"):
+        return schema["examples"][0]
+    if "example" in schema:
+        return schema["example"]
+    if "default" in schema and schema["default"] is not None:
+        return schema["default"]
+    if "const" in schema:
+        return schema["const"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            branches = [s for s in schema[key] if resolve(s, components).get("type") != "null"]
+            return sample_value(branches[0], components) if branches else None
+
+    kind = schema.get("type")
+    if kind in ("integer", "number"):
+        low = schema.get("minimum", schema.get("exclusiveMinimum"))
+        high = schema.get("maximum", schema.get("exclusiveMaximum"))
+        low = 1 if low is None else low
+        high = low + 10 if high is None else high
+        if kind == "integer":
+            return math.floor(low + (high - low) / 2) if high - low > 1 else math.ceil(high)
+        return round(low + (high - low) / 2, 2)
+    if kind == "boolean":
+        return True
+    if kind == "array":
+        return [sample_value(schema.get("items", {}), components)]
+    if kind == "object" or "properties" in schema:
+        return {name: sample_value(prop, components) for name, prop in schema.get("properties", {}).items()}
+    if kind == "string":
+        if schema.get("contentMediaType") == "application/octet-stream" or schema.get("format") == "binary":
+            return b"x" * 1024
+        formats = {
+            "uuid": str(uuid.UUID(int=0x1234)),
+            "date-time": "2026-10-18T12:00:00",
+            "date": "2026-10-18",
+            "time": "12:00:00",
+            "duration": "PT1H",
+            "email": "user@example.com",
+        }
+        if schema.get("format") in formats:
+            return formats[schema["format"]]
+        text = "sample"
+        text = text.ljust(schema.get("minLength", 0), "x")
+        return text[: schema.get("maxLength", len(text))]
+    return "sample"
+
+
+def build_request(module: str, method: str, path: str, operation: dict, components: dict) -> dict:
+    request = {"method": method.upper(), "path": {}, "query": {}, "headers": {}, "cookies": {}}
+    for param in operation.get("parameters", []):
+        if not param.get("required"):
+            continue # leave optional params out unless an override asks for them
+        section = request[{"path": "path", "query": "query", "header": "headers", "cookie": "cookies"}[param["in"]]]
+        schema = resolve(param.get("schema", {}), components)
+        if "properties" in schema:
+            # a param model (Cookie()/Header()/Query() on a BaseModel) that OpenAPI didn't
+            # flatten: FastAPI still reads it field by field, not as one param named after it
+            for name in schema.get("required", []):
+                section[name] = sample_value(schema["properties"][name], components)
+        else:
+            section[param["name"]] = sample_value(schema, components)
+
+    body = operation.get("requestBody")
+    if body:
+        content_type, media = next(iter(body["content"].items()))
+        value = sample_value(media.get("schema", {}), components)
+        if content_type == "application/json":
+            request["json"] = value
+        elif content_type == "application/x-ndjson":
+            request["ndjson"] = [value] * 100
+        elif content_type == "multipart/form-data":
+            request["multipart"] = value
+        else:
+            request["form"] = value
+
+    override = OVERRIDES.get((module, f"{method.upper()} {path}"), {})
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(request.get(key), dict) and key not in ("json", "cookies"):
+            request[key] = {**request[key], **value}
+        else:
+            request[key] = value
+    return request
+
+
+## encoding a request into an ASGI scope + body
+
+def encode_multipart(fields: dict) -> tuple[bytes, str]:
+    boundary = "benchboundary7MA4YWxkTrZu0gW"
+    parts = []
+    for name, value in fields.items():
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, bytes):
+                head = f'Content-Disposition: form-data; name="{name}"; filename="{name}.bin"\r\n' \
+                       "Content-Type: application/octet-stream\r\n\r\n"
+                parts.append(f"--{boundary}\r\n".encode() + head.encode() + item + b"\r\n")
+            else:
+                head = f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                parts.append(f"--{boundary}\r\n{head}{item}\r\n".encode())
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def encode_request(request: dict) -> tuple[dict, bytes]:
+    path = request["route"]
+    for name, value in request["path"].items():
+        path = path.replace("{" + name + "}", str(value))
+
+    headers = [(b"host", b"testserver")]
+    for name, value in request["headers"].items():
+        for item in value if isinstance(value, list) else [value]:
+            headers.append((name.lower().encode(), str(item).encode()))
+    if request["cookies"]:
+        cookie = "; ".join(f"{k}={v}" for k, v in request["cookies"].items())
+        headers.append((b"cookie", cookie.encode()))
+
+    body = b""
+    if "json" in request:
+        body = json.dumps(request["json"]).encode()
+        headers.append((b"content-type", b"application/json"))
+    elif "ndjson" in request:
+        body = b"".join(json.dumps(record).encode() + b"\n" for record in request["ndjson"])
+        headers.append((b"content-type", b"application/x-ndjson"))
+    elif "multipart" in request:
+        body, content_type = encode_multipart(request["multipart"])
+        headers.append((b"content-type", content_type.encode()))
+    elif "form" in request:
+        body = urlencode(request["form"], doseq=True).encode()
+        headers.append((b"content-type", b"application/x-www-form-urlencoded"))
+    if body:
+        headers.append((b"content-length", str(len(body)).encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": request["method"],
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(request["query"], doseq=True).encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+        "extensions": {},
+    }
+    return scope, body
+
+
+## driving the app
+
+class Lifespan:
+    # runs the app's startup/shutdown so apps with background workers behave like under a server
+
+    def __init__(self, app):
+        self.app = app
+        self.state: dict = {}
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.replies: asyncio.Queue = asyncio.Queue()
+        self.task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0", "spec_version": "2.0"}, "state": self.state}
+        self.task = asyncio.create_task(self.app(scope, self.messages.get, self.replies.put))
+        await self.messages.put({"type": "lifespan.startup"})
+        reply = await self.replies.get()
+        if reply["type"] == "lifespan.startup.failed":
+            raise RuntimeError(reply.get("message", "lifespan startup failed"))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.messages.put({"type": "lifespan.shutdown"})
+        await self.replies.get()
+        await self.task
+
+
+async def call(app, scope: dict, body: bytes, state: dict) -> int:
+    status = 0
+    done = asyncio.Event()
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait() # only report a disconnect once the response is finished
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.pathsend" or not message.get("more_body", False):
+            done.set()
+
+    await app({**scope, "state": state.copy()}, receive, send)
+    return status
+
+
+def resolve_values(module: ModuleType, request: dict) -> None:
+    # replaces the FromModule values of a request by what the module makes
+    for section in ("path", "query", "headers", "cookies"):
+        for name, value in request[section].items():
+            if isinstance(value, FromModule):
+                request[section][name] = value.make(module)
+
+
+def percentile(sorted_ns: list[int], p: float) -> float:
+    # nearest-rank percentile, in milliseconds
+    index = max(0, math.ceil(p * len(sorted_ns)) - 1)
+    return sorted_ns[index] / 1e6
+
+
+async def bench_route(app, state: dict, scope: dict, body: bytes, requests: int, warmup: int, concurrency: int) -> dict:
+    for _ in range(warmup):
+        await call(app, scope, body, state)
+
+    latencies: list[int] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter_ns()
+            try:
+                status = await call(app, scope, body, state)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter_ns() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "p999_ms": round(percentile(latencies, 0.999), 4),
+    }
+
+
+async def bench_module(path: Path, args) -> dict[str, dict]:
+    for name in DATABASE_ENV: # each app gets fresh databases in the run's scratch directory
+        os.environ[name] = str(args.scratch / f"{path.stem}_{name.lower()}.db")
+    module = load_module(path)
+    app = module.app
+    schema = app.openapi()
+    components = schema.get("components", {}).get("schemas", {})
+    results = {}
+    async with Lifespan(app) as lifespan:
+        for route, operations in schema["paths"].items():
+            for method, operation in operations.items():
+                if method not in HTTP_METHODS:
+                    continue
+                key = f"{path.stem} {method.upper()} {route}"
+                if args.route and args.route not in key:
+                    continue
+                request = build_request(path.stem, method, route, operation, components)
+                request["route"] = route
+                resolve_values(module, request)
+                scope, body = encode_request(request)
+                with contextlib.redirect_stdout(io.StringIO()): # some tutorials print on every request
+                    results[key] = await bench_route(
+                        app, lifespan.state, scope, body, args.requests, args.warmup, args.concurrency
+                    )
+                print_row(key, results[key])
+    return results
+
+
+## reporting and baselines
+
+def print_row(key: str, result: dict) -> None:
+    if not result["requests"]:
+        print(f"{key:<70} all {result['errors']} requests raised")
+        return
+    statuses = ",".join(f"{s}x{n}" for s, n in sorted(result["statuses"].items()))
+    print(
+        f"{key:<70} {result['rps']:>10.1f} req/s  p50 {result['p50_ms']:.3f}ms"
+        f"  p99 {result['p99_ms']:.3f}ms  p999 {result['p999_ms']:.3f}ms  [{statuses}]"
+    )
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for key, old in baseline["routes"].items():
+        new = results.get(key)
+        if new is None or not old.get("requests"):
+            continue # not run this time (module/--route filter), or nothing to compare against
+        if not new.get("requests"):
+            regressions.append(f"{key}: all {new['errors']} requests raised, the baseline answered {old['requests']}")
+            continue
+        if set(new["statuses"]) != set(old["statuses"]):
+            # a route that now fails fast (404, 422, 500) must not pass as a speed-up
+            regressions.append(f"{key}: statuses {sorted(old['statuses'])} -> {sorted(new['statuses'])}")
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if new[metric] > old[metric] * (1 + threshold):
+                regressions.append(
+                    f"{key}: {metric} {old[metric]:.3f}ms -> {new[metric]:.3f}ms "
+                    f"(+{(new[metric] / old[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="module name prefixes, e.g. 04 07_query")
+    parser.add_argument("--route", help="only routes whose key contains this text")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests per route")
+    parser.add_argument("--concurrency", type=int, default=1, help="in-flight requests per route")
+    parser.add_argument("--save", type=Path, help="write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="asgi_bench_") as scratch:
+        args.scratch = Path(scratch)
+        for path in discover(args.modules):
+            results.update(asyncio.run(bench_module(path, args)))
+
+    if args.save:
+        args.save.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "routes": results,
+        }, indent=2))
+        print(f"baseline saved to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no route slower than {args.threshold:.0%} over {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# open-loop load generator, request mix taken from the examples declared in the OpenAPI schema
+
+'''
+Drives a RUNNING server (over HTTP, unlike asgi_bench.py) with the example
+payloads the app itself declares: Body(openapi_examples=...), Body(examples=[...]),
+model `example`s and field `examples`. Every example is one entry of the mix,
+weighted by its "x-weight" (in openapi_examples) or by --weight, default 1.
+Path/query/header/cookie params are filled the same way as in asgi_bench.py.
+
+Open loop: requests start at a fixed arrival rate (--rate per second) whether
+or not the previous ones have answered, and latency is measured from when a
+request SHOULD have started. A stalled server can't slow the generator down
+and hide its own stall (coordinated omission).
+
+usage (from the repo root):
+    fastapi run 02_tutorial/10_declare_request_example_data.py --port 8000
+    python 03_benchmarks/openapi_loadgen.py http://127.0.0.1:8000 --rate 500 --duration 30
+    python 03_benchmarks/openapi_loadgen.py http://127.0.0.1:8000 --schema 10 --weight normal=10 --json out.json
+
+--schema takes the schema from a 02_tutorial module (by prefix) instead of the
+server's /openapi.json.
+'''
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from asgi_bench import HTTP_METHODS, build_request, discover, load_module, resolve, sample_value
+
+
+## request mix
+
+def declared_examples(media: dict, components: dict) -> dict[str, tuple[Any, float | None]]:
+    # example name -> (value, x-weight)
+    if media.get("examples"): # Body(openapi_examples=...)
+        return {
+            name: (example["value"], example.get("x-weight"))
+            for name, example in media["examples"].items() if "value" in example
+        }
+    schema = media.get("schema", {})
+    for candidate in (schema, resolve(schema, components)): # Body(examples=[...]), then the model's own
+        if candidate.get("examples"):
+            return {str(index): (value, None) for index, value in enumerate(candidate["examples"])}
+        if "example" in candidate:
+            return {"example": (candidate["example"], None)}
+    properties = resolve(schema, components).get("properties", {})
+    if any(resolve(prop, components).get("examples") for prop in properties.values()): # Field(examples=[...])
+        return {"fields": (sample_value(schema, components), None)}
+    return {}
+
+
+def build_mix(schema: dict, module: str, weights: dict[str, float]) -> list[dict]:
+    components = schema.get("components", {}).get("schemas", {})
+    mix = []
+    for route, operations in schema["paths"].items():
+        for method, operation in operations.items():
+            if method not in HTTP_METHODS:
+                continue
+            media = operation.get("requestBody", {}).get("content", {}).get("application/json")
+            if media is None:
+                continue
+            for name, (value, weight) in declared_examples(media, components).items():
+                request = build_request(module, method, route, operation, components)
+                request["json"] = value
+                key = f"{method.upper()} {route} [{name}]"
+                weight = next((w for pattern, w in weights.items() if pattern in key), weight)
+                mix.append({"key": key, "route": route, "weight": 1 if weight is None else weight, **request})
+    return mix
+
+
+def to_httpx(entry: dict) -> dict:
+    path = entry["route"]
+    for name, value in entry["path"].items():
+        path = path.replace("{" + name + "}", str(value))
+    headers = {name: str(value) for name, value in entry["headers"].items()}
+    if entry["cookies"]: # a plain header, httpx only keeps cookies per client
+        headers["cookie"] = "; ".join(f"{name}={value}" for name, value in entry["cookies"].items())
+    return {"method": entry["method"], "url": path, "params": entry["query"], "json": entry["json"], "headers": headers}
+
+
+## latency histogram
+
+class LatencyHistogram:
+    # log-linear buckets (SUB_BUCKETS per power of 2 of microseconds): ~4% resolution, constant memory
+    SUB_BUCKETS = 16
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.max_us = 0.0
+        self.statuses: dict[str, int] = {}
+
+    def bucket(self, us: float) -> int:
+        return int(math.log2(max(us, 1.0)) * self.SUB_BUCKETS)
+
+    def record(self, us: float, status: str):
+        index = self.bucket(us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.max_us = max(self.max_us, us)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def percentile(self, p: float) -> float:
+        # upper bound of the bucket holding the p-th value, in milliseconds
+        rank = max(1, math.ceil(p * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(2 ** ((index + 1) / self.SUB_BUCKETS), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def octaves(self) -> list[tuple[float, int]]:
+        # (upper bound in ms, count) per power of 2, for printing
+        rows: dict[int, int] = {}
+        for index, count in self.counts.items():
+            octave = index // self.SUB_BUCKETS + 1
+            rows[octave] = rows.get(octave, 0) + count
+        return [(2 ** octave / 1000, rows.get(octave, 0)) for octave in range(min(rows), max(rows) + 1)] if rows else []
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.total,
+            "statuses": self.statuses,
+            **{f"p{label}_ms": round(self.percentile(p), 3) for label, p in (("50", 0.5), ("90", 0.9), ("99", 0.99), ("999", 0.999))},
+            "max_ms": round(self.max_us / 1000, 3),
+            "histogram_ms": [[round(upper, 3), count] for upper, count in self.octaves()],
+        }
+
+
+## driving the server
+
+async def drive(url: str, mix: list[dict], args) -> dict[str, LatencyHistogram]:
+    rng = random.Random(args.seed)
+    total = int(args.rate * args.duration)
+    picks = rng.choices(range(len(mix)), weights=[entry["weight"] for entry in mix], k=total)
+    requests = [to_httpx(entry) for entry in mix]
+    histograms = {entry["key"]: LatencyHistogram() for entry in mix}
+    loop = asyncio.get_running_loop()
+    in_flight: set[asyncio.Task] = set()
+    dispatch_lag = 0.0 # how late the generator itself started requests, the server isn't the only suspect
+
+    async def fire(client: httpx.AsyncClient, pick: int, intended: float):
+        try:
+            response = await client.request(**requests[pick])
+            status = str(response.status_code)
+        except httpx.HTTPError as exc:
+            status = type(exc).__name__
+        # from the INTENDED start: time spent waiting for a connection or for a late dispatcher counts
+        histograms[mix[pick]["key"]].record((loop.time() - intended) * 1e6, status)
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        start = loop.time() + 0.1
+        intended = start
+        for pick in picks:
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                dispatch_lag = max(dispatch_lag, -delay)
+            task = asyncio.create_task(fire(client, pick, intended))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            # next arrival: fixed interval, or exponential gaps for a poisson process
+            intended += rng.expovariate(args.rate) if args.arrivals == "poisson" else 1 / args.rate
+        await asyncio.gather(*in_flight)
+    if dispatch_lag > 0.01:
+        print(f"warning: the generator started requests up to {dispatch_lag * 1000:.1f}ms late, "
+              "it may be the bottleneck (lower --rate or run several generators)", file=sys.stderr)
+    return histograms
+
+
+def print_report(histograms: dict[str, LatencyHistogram], width: int = 40):
+    for key, histogram in histograms.items():
+        if not histogram.total:
+            continue
+        summary = histogram.summary()
+        print(f"\n{key}  {summary['requests']} requests  {summary['statuses']}")
+        print(
+            f"  p50 {summary['p50_ms']:.3f}ms  p90 {summary['p90_ms']:.3f}ms  p99 {summary['p99_ms']:.3f}ms  "
+            f"p99.9 {summary['p999_ms']:.3f}ms  max {summary['max_ms']:.3f}ms"
+        )
+        peak = max(count for _, count in histogram.octaves())
+        for upper, count in histogram.octaves():
+            print(f"  <= {upper:>9.3f}ms {count:>8} {'#' * round(width * count / peak)}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url", help="base url of the running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--schema", help="take the schema from this 02_tutorial module (prefix) instead of /openapi.json")
+    parser.add_argument("--rate", type=float, default=200, help="requests started per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--arrivals", choices=["uniform", "poisson"], default="uniform")
+    parser.add_argument("--weight", action="append", default=[], metavar="PATTERN=WEIGHT",
+                        help="weight of the examples whose key contains PATTERN, repeatable")
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the per-example summaries and histograms to this file")
+    args = parser.parse_args(argv)
+
+    if args.schema:
+        path = discover([args.schema])[0]
+        module, schema = path.stem, load_module(path).app.openapi()
+    else:
+        module, schema = "", httpx.get(f"{args.url.rstrip('/')}/openapi.json", timeout=args.timeout).json()
+    weights = {pattern: float(weight) for pattern, weight in (item.rsplit("=", 1) for item in args.weight)}
+    mix = build_mix(schema, module, weights)
+    if not mix:
+        print("no declared examples in the schema", file=sys.stderr)
+        return 1
+
+    total_weight = sum(entry["weight"] for entry in mix)
+    print(f"{len(mix)} examples, {args.rate:g} req/s for {args.duration:g}s ({args.arrivals} arrivals)")
+    for entry in mix:
+        print(f"  {entry['weight'] / total_weight:6.1%}  {entry['key']}")
+
+    histograms = asyncio.run(drive(args.url, mix, args))
+    print_report(histograms)
+    if args.json:
+        Path(args.json).write_text(json.dumps({key: h.summary() for key, h in histograms.items()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())